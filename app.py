@@ -1,31 +1,45 @@
 import os
+import io
+import importlib
 import json
 import asyncio
 import uuid
-import glob
 import secrets
-import psycopg2
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from psycopg2.extras import RealDictCursor
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, Response, request, jsonify, redirect, render_template, session, send_file, stream_with_context
 
 import google.generativeai as genai
-import edge_tts
-from pydub import AudioSegment
-import pypdf
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from config import Config
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
+from db import get_db_connection, init_db
+from scheduler import Scheduler
+from artifacts import artifacts, asset_url, PART_SUFFIX
+from snapshot import export_snapshot, import_snapshot
+from conversation import ConversationStore
+from ingest import create_job, get_jobs, job_cost, submit_job, start_resume_loop
+from json_stream import JsonArrayStream, QUIZ_ITEM, FLASHCARD_ITEM, SLIDE_ITEM
+from prompts import (
+    build_prompt, build_project_prompt, PromptTooLong, CHAT_PROMPT, SUMMARY_PROMPT, PODCAST_PROMPT,
+    FLOWCHART_PROMPT, QUIZ_PROMPT, FLASHCARD_PROMPT, SLIDES_PROMPT, VIDEO_PROMPT,
+)
 
-from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
 import shutil
 
+# The media and document stacks (edge_tts, moviepy, PIL, python-pptx, pypdf) are
+# imported inside the features that use them, so chat-only workers never load them.
+
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.getenv('SECRET_KEY', secrets.token_hex(32))
+app.config['USE_X_SENDFILE'] = Config.USE_X_SENDFILE
+app.register_blueprint(artifacts)
+if Config.TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXIES)
+app.jinja_env.globals['asset_url'] = asset_url
 
 # Configuration
 genai.configure(api_key=Config.GEMINI_API_KEY)
@@ -34,65 +48,21 @@ model = genai.GenerativeModel(
     generation_config=Config.GENERATION_CONFIG,
 )
 
-def get_db_connection():
-    """Connect to Supabase PostgreSQL with connection pooling"""
-    conn = psycopg2.connect(
-        Config.DATABASE_URL,
-        sslmode='require',
-        connect_timeout=10
-    )
-    return conn
+# Dedicated workers can import their role's heavy modules at boot instead of on first request
+for role in Config.WORKER_PRELOAD:
+    for module in Config.ROLE_MODULES[role]:
+        importlib.import_module(module)
+conversations = ConversationStore()
+# Each live podcast stream holds a worker thread while it follows the part file
+podcast_tails = threading.BoundedSemaphore(Config.PODCAST_MAX_TAILS)
 
-def init_db():
-    """Initialize database with required table and pgvector extension"""
-    conn = None
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-
-        cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
-        
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS documents (
-                id SERIAL PRIMARY KEY,
-                content TEXT NOT NULL,
-                metadata JSONB,
-                embedding vector(768),
-                user_id TEXT NOT NULL DEFAULT 'default_user',
-                project_id TEXT NOT NULL DEFAULT 'default_project',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS documents_embedding_idx 
-            ON documents USING ivfflat (embedding vector_cosine_ops)
-            WITH (lists = 100)
-        """)
-        
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_user_project 
-            ON documents(user_id, project_id)
-        """)
-        
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_created_at 
-            ON documents(created_at DESC)
-        """)
-        
-        conn.commit()
-        cur.close()
-        print("✓ Database initialized successfully on Supabase")
-    except Exception as e:
-        print(f"Database initialization: {e}")
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
+# Every serving process sweeps for unfinished ingest jobs; the lease in process_job
+# stops them running twice. Started on the first request rather than at import, so
+# tooling that imports app and the reloader's parent process never touch the queue.
+@app.before_request
+def start_background_workers():
+    start_resume_loop()
 
 def get_user_session():
     """Get or create user session with project ID"""
@@ -102,16 +72,52 @@ def get_user_session():
         session['project_id'] = f"project_{uuid.uuid4().hex[:12]}"
     return session['user_id'], session['project_id']
 
+scheduler = Scheduler(identify=get_user_session)
+
+# Request costs for the scheduler. They run before the view validates the
+# request, so anything malformed costs 1 and is rejected by the view.
+def upload_cost():
+    files = [f for f in request.files.getlist('file') if f.filename]
+    return max(len(files), job_cost(request.content_length or 0)) if files else 1
+
+def batch_chat_cost():
+    data = request.get_json(silent=True)
+    queries = data.get('queries') if isinstance(data, dict) else None
+    if isinstance(queries, list) and all(isinstance(q, str) and q.strip() for q in queries):
+        return len(queries)
+    return 1
+
 # Helpers
-def chunk_text(text, chunk_size=1000, overlap=200):
-    chunks = []
-    start = 0
-    text_len = len(text)
-    while start < text_len:
-        end = min(start + chunk_size, text_len)
-        chunks.append(text[start:end])
-        start += (chunk_size - overlap)
-    return chunks
+def fetch_project_chunks(conn, user_id, project_id, limit=50):
+    """Most recent chunks of a project, newest first"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute("""
+        SELECT content FROM documents 
+        WHERE user_id = %s AND project_id = %s
+        ORDER BY created_at DESC 
+        LIMIT %s
+    """, (user_id, project_id, limit))
+    rows = cur.fetchall()
+    cur.close()
+    return [row['content'] for row in rows]
+
+def project_version(conn, user_id, project_id):
+    """Newest document id in a project; changes whenever documents are added"""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT COALESCE(MAX(id), 0) FROM documents WHERE user_id = %s AND project_id = %s",
+        (user_id, project_id)
+    )
+    version = cur.fetchone()[0]
+    cur.close()
+    return version
+
+def summarize_turns(previous_summary, turns):
+    """Fold earlier chat turns into the rolling conversation summary"""
+    lines = [f"Earlier summary: {previous_summary}"] if previous_summary else []
+    lines += [f"User: {query}\nAssistant: {answer}" for query, answer in turns]
+    prompt = build_prompt('summary', SUMMARY_PROMPT, lines, separator="\n\n")
+    return model.generate_content(prompt).text.strip()
 
 def generate_audio_with_gtts(text, output_file):
     """Fallback audio generation using Google TTS"""
@@ -125,6 +131,7 @@ def generate_audio_with_gtts(text, output_file):
         return False
 
 async def generate_audio_clip(text, voice, output_file):
+    import edge_tts
     try:
         communicate = edge_tts.Communicate(text, voice)
         await communicate.save(output_file)
@@ -133,24 +140,44 @@ async def generate_audio_clip(text, voice, output_file):
         print(f"Audio generation error for {output_file}: {e}")
         return False
 
-async def generate_all_audio_clips(script_json, temp_dir):
-    """Generate all audio clips using proper async approach"""
-    audio_files = []
+def generate_narration(i, narration, audio_dir):
+    """Narrate slide i with Edge TTS, falling back to Google TTS; None if both fail"""
+    narration = narration.strip()
     
-    for i, turn in enumerate(script_json):
-        speaker = turn.get('speaker', 'Host A')
-        text = turn.get('text', '')
-        if not text:
-            continue
-            
-        voice = "en-US-GuyNeural" if speaker == "Host A" else "en-US-JennyNeural"
-        filename = f"{temp_dir}/chunk_{i}.mp3"
-        
-        success = await generate_audio_clip(text, voice, filename)
-        if success and os.path.exists(filename):
-            audio_files.append(filename)
+
+    if not narration or len(narration) < 10:
+        print(f"⚠ Slide {i}: No narration text")
+        return None
     
-    return audio_files
+
+    narration = narration.replace('"', '').replace("'", "").replace('\n', ' ')
+    narration = ' '.join(narration.split())  
+    
+    audio_path = os.path.join(audio_dir, f"narration_{i}.mp3")
+    
+
+    try:
+        print(f"Trying Edge TTS for slide {i}...")
+        success = asyncio.run(generate_audio_clip(narration, "en-US-GuyNeural", audio_path))
+        if success and os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
+            print(f"✓ Edge TTS success for slide {i}")
+            return audio_path
+    except Exception as e:
+        print(f"⚠ Edge TTS failed for slide {i}: {str(e)[:100]}")
+    
+
+    try:
+        print(f"Trying Google TTS for slide {i}...")
+        success = generate_audio_with_gtts(narration, audio_path)
+        if success and os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
+            print(f"✓ Google TTS success for slide {i}")
+            return audio_path
+    except Exception as e:
+        print(f"⚠ Google TTS also failed for slide {i}: {str(e)[:100]}")
+    
+
+    print(f"✗ All audio methods failed for slide {i}, using silent 10s duration")
+    return None
 
 # Routes
 @app.route('/')
@@ -158,67 +185,26 @@ def index():
     return render_template('index.html')
 
 @app.route('/upload', methods=['POST'])
+@scheduler.limit('ingest', cost=upload_cost)
 def upload_file():
     conn = None
     try:
-        file = request.files.get('file')
-        if not file:
+        files = [f for f in request.files.getlist('file') if f.filename]
+        if not files:
             return jsonify({'error': 'No file uploaded'}), 400
         
-        filename = file.filename
-        text_content = ""
-        
-        if filename.endswith('.pdf'):
-            pdf_reader = pypdf.PdfReader(file)
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_content += page_text
-        else:
-
-            text_content = file.read().decode('utf-8')
-
-        if not text_content.strip():
-            return jsonify({'error': 'No text content found in file'}), 400
-
-        chunks = chunk_text(text_content)
-        
-        if len(chunks) > 500:
-            return jsonify({'error': 'File too large. Please upload smaller files.'}), 400
-        
-
         user_id, project_id = get_user_session()
         
         conn = get_db_connection()
-        cur = conn.cursor()
-
-        processed_count = 0
-        for chunk in chunks:
-
-            embedding_result = genai.embed_content(
-                model=Config.EMBEDDING_MODEL,
-                content=chunk,
-                task_type="retrieval_document"
-            )
-            embedding = embedding_result['embedding']
-            
-
-            if len(embedding) != 768:
-                raise ValueError(f"Unexpected embedding dimension: {len(embedding)}")
-            
-
-            cur.execute(
-                "INSERT INTO documents (content, metadata, embedding, user_id, project_id) VALUES (%s, %s, %s, %s, %s)",
-                (chunk, json.dumps({'filename': filename}), embedding, user_id, project_id)
-            )
-            processed_count += 1
-            
-        conn.commit()
-        cur.close()
+        jobs = []
+        for file in files:
+            job_id = create_job(conn, user_id, project_id, file)
+            submit_job(job_id, user_id)
+            jobs.append({'id': job_id, 'filename': file.filename})
         
-        print(f"✓ Uploaded {processed_count} chunks to Supabase for user: {user_id}, project: {project_id}")
+        print(f"✓ Queued {len(jobs)} files for user: {user_id}, project: {project_id}")
         
-        return jsonify({'message': f'Successfully processed {processed_count} chunks from {filename}'}), 200
+        return jsonify({'message': f'Processing {len(jobs)} file(s) in the background', 'jobs': jobs}), 202
 
     except Exception as e:
         print(f"Upload error: {e}")
@@ -229,7 +215,62 @@ def upload_file():
         if conn:
             conn.close()
 
+@app.route('/upload/jobs', methods=['GET'])
+def upload_jobs():
+    conn = None
+    try:
+        user_id, project_id = get_user_session()
+        conn = get_db_connection()
+        return jsonify({'jobs': get_jobs(conn, user_id, project_id)})
+    except Exception as e:
+        print(f"Upload jobs error: {e}")
+        return jsonify({'error': 'Failed to load upload progress.'}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@app.route('/upload/jobs/<job_id>', methods=['GET'])
+def upload_job(job_id):
+    conn = None
+    try:
+        user_id, project_id = get_user_session()
+        conn = get_db_connection()
+        jobs = get_jobs(conn, user_id, project_id, job_id)
+        if not jobs:
+            return jsonify({'error': 'Upload not found'}), 404
+        return jsonify(jobs[0])
+    except Exception as e:
+        print(f"Upload job error: {e}")
+        return jsonify({'error': 'Failed to load upload progress.'}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@app.route('/upload/jobs/<job_id>/resume', methods=['POST'])
+@scheduler.limit('ingest')
+def resume_upload_job(job_id):
+    conn = None
+    try:
+        user_id, project_id = get_user_session()
+        conn = get_db_connection()
+        jobs = get_jobs(conn, user_id, project_id, job_id)
+        if not jobs:
+            return jsonify({'error': 'Upload not found'}), 404
+        if jobs[0]['status'] == 'done':
+            return jsonify({'error': 'Upload already processed'}), 400
+        if jobs[0]['status'] == 'processing' and not jobs[0]['stalled']:
+            return jsonify({'error': 'Upload is already being processed'}), 409
+        submit_job(job_id, user_id)
+        return jsonify({'message': 'Upload resumed'}), 202
+    except Exception as e:
+        print(f"Resume upload error: {e}")
+        return jsonify({'error': 'Failed to resume upload.'}), 500
+    finally:
+        if conn:
+            conn.close()
+
 @app.route('/chat', methods=['POST'])
+@scheduler.limit('chat')
 def chat():
     conn = None
     try:
@@ -252,45 +293,59 @@ def chat():
         print(f"Query embedding size: {len(query_embedding)}")
 
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        version = project_version(conn, user_id, project_id)
 
+        conversation = conversations.get((user_id, project_id))
+        with conversation.lock:
+            relevant_chunks = conversation.reusable_chunks(query_embedding, version)
+            history = conversation.history_text()
 
-        cur.execute("""
-            SELECT content, 1 - (embedding <=> %s::vector) as similarity
-            FROM documents
-            WHERE user_id = %s 
-            AND project_id = %s
-            AND 1 - (embedding <=> %s::vector) > 0.3
-            ORDER BY similarity DESC
-            LIMIT 5
-        """, (query_embedding, user_id, project_id, query_embedding))
-        
-        results = cur.fetchall()
-        
-        print(f"Found {len(results)} matching documents for user: {user_id}, project: {project_id}")
-        if results:
-            print(f"Best similarity score: {results[0]['similarity']}")
-        
-        cur.close()
-        
-        if not results:
-            return jsonify({'answer': 'I couldn\'t find relevant information in your sources to answer this question.'})
-        
-        relevant_chunks = [row['content'] for row in results]
-        context = "\n\n".join(relevant_chunks)
-        
-        prompt = f"""You are a helpful assistant. Answer the user question strictly based on the provided context.
-        
-Context:
-{context}
-
-Question: {user_query}
+        if relevant_chunks is not None:
+            print(f"Reusing {len(relevant_chunks)} chunks from previous turn for user: {user_id}, project: {project_id}")
+        else:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+
+            cur.execute("""
+                SELECT content, 1 - (embedding <=> %s::vector) as similarity
+                FROM documents
+                WHERE user_id = %s 
+                AND project_id = %s
+                AND 1 - (embedding <=> %s::vector) > 0.3
+                ORDER BY similarity DESC
+                LIMIT 5
+            """, (query_embedding, user_id, project_id, query_embedding))
+            
+            results = cur.fetchall()
+            
+            print(f"Found {len(results)} matching documents for user: {user_id}, project: {project_id}")
+            if results:
+                print(f"Best similarity score: {results[0]['similarity']}")
+            
+            cur.close()
+            
+            if not results:
+                return jsonify({'answer': 'I couldn\'t find relevant information in your sources to answer this question.'})
+            
+            relevant_chunks = [row['content'] for row in results]
+            with conversation.lock:
+                conversation.remember_retrieval(query_embedding, relevant_chunks, version)
 
-Answer:"""
+        prompt = build_prompt('chat', CHAT_PROMPT, relevant_chunks, history=history, query=user_query)
         
         response = model.generate_content(prompt)
-        return jsonify({'answer': response.text})
+        answer = response.text
+
+        with conversation.lock:
+            conversation.add_turn(user_query, answer)
+            compact = conversation.needs_compaction()
+        if compact:
+            threading.Thread(target=conversation.compact, args=(summarize_turns,), daemon=True).start()
 
+        return jsonify({'answer': answer})
+
+    except PromptTooLong as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Chat error: {e}")
         error_msg = str(e)
@@ -301,91 +356,232 @@ Answer:"""
         if conn:
             conn.close()
 
-@app.route('/generate_audio', methods=['POST'])
-def generate_audio():
+@app.route('/chat/batch', methods=['POST'])
+@scheduler.limit('chat', cost=batch_chat_cost)
+def chat_batch():
     conn = None
     try:
+        data = request.get_json(silent=True)
+        queries = data.get('queries') if isinstance(data, dict) else None
+        if not queries or not isinstance(queries, list) or not all(isinstance(q, str) and q.strip() for q in queries):
+            return jsonify({'error': 'A non-empty list of queries is required'}), 400
+        if len(queries) > Config.BATCH_CHAT_MAX_QUERIES:
+            return jsonify({'error': f'At most {Config.BATCH_CHAT_MAX_QUERIES} queries per batch'}), 400
 
         user_id, project_id = get_user_session()
-        
+
+        embedding_result = genai.embed_content(
+            model=Config.EMBEDDING_MODEL,
+            content=queries,
+            task_type="retrieval_query"
+        )
+        query_embeddings = embedding_result['embedding']
+
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        
 
         cur.execute("""
-            SELECT content FROM documents 
-            WHERE user_id = %s AND project_id = %s
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """, (user_id, project_id))
-        rows = cur.fetchall()
+            SELECT q.idx, d.content
+            FROM unnest(%s::text[]) WITH ORDINALITY AS q(query_embedding, idx)
+            CROSS JOIN LATERAL (
+                SELECT content, 1 - (embedding <=> q.query_embedding::vector) as similarity
+                FROM documents
+                WHERE user_id = %s 
+                AND project_id = %s
+                AND 1 - (embedding <=> q.query_embedding::vector) > 0.3
+                ORDER BY similarity DESC
+                LIMIT 5
+            ) d
+            ORDER BY q.idx, d.similarity DESC
+        """, ([str(e) for e in query_embeddings], user_id, project_id))
+
+        chunks_by_query = [[] for _ in queries]
+        for row in cur.fetchall():
+            chunks_by_query[row['idx'] - 1].append(row['content'])
         cur.close()
-        
-        if not rows:
-            return jsonify({'error': 'No content available to generate audio'}), 400
-        
-        all_text = " ".join([row['content'] for row in rows])
-        
 
-        if len(all_text) > 50000:
-            all_text = all_text[:50000]
-            last_period = all_text.rfind('.')
-            if last_period > 40000:
-                all_text = all_text[:last_period + 1]
+        print(f"Batch of {len(queries)} queries retrieved for user: {user_id}, project: {project_id}")
+
+    except Exception as e:
+        print(f"Batch chat error: {e}")
+        error_msg = str(e)
+        if "429" in error_msg or "quota" in error_msg.lower():
+            return jsonify({'error': 'API quota exceeded. Please wait a moment and try again.'}), 429
+        return jsonify({'error': 'Failed to process your questions. Please try again.'}), 500
+    finally:
+        if conn:
+            conn.close()
 
-        script_prompt = f"""Generate a podcast script between two hosts (Host A and Host B) discussing this content. 
-Make it conversational, engaging, and use simple English. Keep it concise (max 8-10 exchanges).
-Format as JSON: [{{"speaker": "Host A", "text": "..."}}, {{"speaker": "Host B", "text": "..."}}].
+    def answer(index):
+        if not chunks_by_query[index]:
+            return 'I couldn\'t find relevant information in your sources to answer this question.'
+        prompt = build_prompt('chat', CHAT_PROMPT, chunks_by_query[index], history="", query=queries[index])
+        return model.generate_content(prompt).text
 
-Content:
-{all_text}
-"""
+    def generate():
+        # Answers are written as NDJSON lines in completion order, not request order
+        executor = ThreadPoolExecutor(max_workers=Config.BATCH_CHAT_CONCURRENCY)
+        try:
+            futures = {executor.submit(answer, i): i for i in range(len(queries))}
+            for future in as_completed(futures):
+                index = futures[future]
+                result = {'index': index, 'query': queries[index]}
+                try:
+                    result['answer'] = future.result()
+                except PromptTooLong as e:
+                    result['error'] = str(e)
+                except Exception as e:
+                    print(f"Batch chat error for query {index}: {e}")
+                    result['error'] = 'Failed to process this question.'
+                yield json.dumps(result) + "\n"
+        finally:
+            # On disconnect, drop the questions not yet started instead of generating them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/chat/reset', methods=['POST'])
+def reset_chat():
+    user_id, project_id = get_user_session()
+    conversations.reset((user_id, project_id))
+    return jsonify({'message': 'Conversation cleared'})
+
+def start_podcast_script(conn, user_id, project_id):
+    """Start streaming the podcast script for a project; None if it has no content"""
+    chunks = fetch_project_chunks(conn, user_id, project_id)
+    if not chunks:
+        return None
+
+    script_prompt = build_project_prompt('podcast', PODCAST_PROMPT, chunks)
+    
+    model_config = {"response_mime_type": "application/json"}
+    script_model = genai.GenerativeModel(Config.MODEL_NAME, generation_config=model_config)
+    return script_model.generate_content(script_prompt, stream=True)
+
+def podcast_path(job_id):
+    """Output path of a podcast job, or None if job_id is not one we issued"""
+    try:
+        if str(uuid.UUID(job_id)) != job_id:
+            return None
+    except ValueError:
+        return None
+    return os.path.join("static", f"audio_overview_{job_id}.mp3")
+
+@app.route('/generate_audio', methods=['POST'])
+@scheduler.limit('render')
+def generate_audio():
+    conn = None
+    try:
+
+        user_id, project_id = get_user_session()
         
-        model_config = {"response_mime_type": "application/json"}
-        script_model = genai.GenerativeModel(Config.MODEL_NAME, generation_config=model_config)
+        conn = get_db_connection()
+        script_response = start_podcast_script(conn, user_id, project_id)
+        conn.close()
+        conn = None
         
-        script_response = script_model.generate_content(script_prompt)
-        script_json = json.loads(script_response.text)
+        if script_response is None:
+            return jsonify({'error': 'No content available to generate audio'}), 400
         
-        temp_dir = "temp_audio"
-        os.makedirs(temp_dir, exist_ok=True)
+        output_filename = f"audio_overview_{uuid.uuid4()}.mp3"
+        output_path = os.path.join("static", output_filename)
         
-
-        audio_files = asyncio.run(generate_all_audio_clips(script_json, temp_dir))
+        from podcast import stream_podcast
+        audio_bytes = sum(len(audio) for audio in stream_podcast(script_response, output_path))
         
-        if not audio_files:
+        if not audio_bytes:
             return jsonify({'error': 'Failed to generate audio clips'}), 500
         
+        return jsonify({'audio_url': f'/static/{output_filename}'})
 
-        combined_audio = AudioSegment.empty()
-        for filename in audio_files:
-            try:
-                segment = AudioSegment.from_mp3(filename)
-                combined_audio += segment
-            except Exception as e:
-                print(f"Error loading audio segment {filename}: {e}")
+    except Exception as e:
+        print(f"Error in generate_audio: {e}")
+        return jsonify({'error': 'Failed to generate audio. Please try again.'}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@app.route('/generate_audio/stream', methods=['POST'])
+@scheduler.limit('render')
+def start_audio_stream():
+    """Start a podcast in the background and return where to follow it"""
+    conn = None
+    try:
+
+        user_id, project_id = get_user_session()
         
-        output_filename = f"audio_overview_{uuid.uuid4()}.mp3"
-        output_path = os.path.join("static", output_filename)
-        combined_audio.export(output_path, format="mp3")
+        conn = get_db_connection()
+        script_response = start_podcast_script(conn, user_id, project_id)
         
+        if script_response is None:
+            return jsonify({'error': 'No content available to generate audio'}), 400
 
-        for f in audio_files:
-            try:
-                os.remove(f)
-            except:
-                pass
-        
-        return jsonify({'audio_url': f'/static/{output_filename}'})
+        from podcast import start_podcast
+        job_id = str(uuid.uuid4())
+        start_podcast(script_response, podcast_path(job_id), user_id)
+
+        return jsonify({
+            'id': job_id,
+            'stream_url': f'/generate_audio/stream/{job_id}',
+            'status_url': f'/generate_audio/{job_id}',
+            'audio_url': f'/static/audio_overview_{job_id}.mp3'
+        }), 202
 
     except Exception as e:
-        print(f"Error in generate_audio: {e}")
+        print(f"Error in start_audio_stream: {e}")
         return jsonify({'error': 'Failed to generate audio. Please try again.'}), 500
     finally:
         if conn:
             conn.close()
 
+@app.route('/generate_audio/stream/<job_id>', methods=['GET'])
+def audio_stream(job_id):
+    """Progressive MP3 of a podcast job; safe to fetch again, it never regenerates"""
+    output_path = podcast_path(job_id)
+    if output_path is None:
+        return jsonify({'error': 'Audio not found'}), 404
+
+    from podcast import podcast_status, tail_podcast
+    status = podcast_status(output_path)
+    if status == 'done':
+        # The finished file supports Range, so seeking works
+        return redirect(f'/static/{os.path.basename(output_path)}')
+    if status != 'running':
+        return jsonify({'error': 'Audio not found'}), 404
+
+    if not podcast_tails.acquire(blocking=False):
+        response = jsonify({'error': 'Too many live streams. The audio will be ready shortly.'})
+        response.headers['Retry-After'] = str(Config.SCHEDULER_RETRY_AFTER)
+        return response, 503
+    try:
+        body = tail_podcast(output_path)
+    except FileNotFoundError:
+        podcast_tails.release()
+        return jsonify({'error': 'Audio not found'}), 404
+
+    response = Response(stream_with_context(body), mimetype='audio/mpeg')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['Accept-Ranges'] = 'none'
+    response.call_on_close(podcast_tails.release)
+    return response
+
+@app.route('/generate_audio/<job_id>', methods=['GET'])
+def audio_status(job_id):
+    output_path = podcast_path(job_id)
+    if output_path is None:
+        return jsonify({'error': 'Audio not found'}), 404
+
+    from podcast import podcast_status
+    status = podcast_status(output_path)
+    if status == 'missing':
+        return jsonify({'error': 'Audio not found'}), 404
+    result = {'id': job_id, 'status': status}
+    if status == 'done':
+        result['audio_url'] = f'/static/{os.path.basename(output_path)}'
+    return jsonify(result)
+
 @app.route('/generate_study_aid', methods=['POST'])
+@scheduler.limit('chat')
 def generate_study_aid():
     conn = None
     try:
@@ -399,65 +595,37 @@ def generate_study_aid():
         user_id, project_id = get_user_session()
         
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-
-        cur.execute("""
-            SELECT content FROM documents 
-            WHERE user_id = %s AND project_id = %s
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """, (user_id, project_id))
-        rows = cur.fetchall()
-        cur.close()
+        chunks = fetch_project_chunks(conn, user_id, project_id)
         
-        if not rows:
+        if not chunks:
             return jsonify({'error': 'No content available'}), 400
         
-        all_text = " ".join([row['content'] for row in rows])
-        
-
-        if len(all_text) > 50000:
-            all_text = all_text[:50000]
-            last_period = all_text.rfind('.')
-            if last_period > 40000:
-                all_text = all_text[:last_period + 1]
-        
         if aid_type == 'flowchart':
-            prompt = f"""Generate Mermaid.js code representing the key concepts and their relationships in this text. 
-Return ONLY the mermaid code starting with 'graph TD' or 'graph LR'. Do not include markdown code fences or any other text.
-
-Text: {all_text}"""
+            prompt = build_project_prompt('study_aid', FLOWCHART_PROMPT, chunks)
             
             resp = model.generate_content(prompt)
             clean_text = resp.text.replace('```mermaid', '').replace('```', '').strip()
             return jsonify({'content': clean_text})
             
-        elif aid_type in ['flashcard', 'quiz']:
-            if aid_type == 'quiz':
-                prompt = f"""Generate a JSON array of 5-7 multiple choice questions based on the text.
-Each question should have:
-- question: the question text
-- options: array of 4 possible answers
-- answer: the correct answer (must be one of the options)
-- explanation: brief explanation of why this is correct (1-2 sentences)
-- wrongExplanation: brief explanation shown for wrong answers (1-2 sentences)
-
-Format: [{{"question": "...", "options": ["A", "B", "C", "D"], "answer": "A", "explanation": "...", "wrongExplanation": "..."}}]
-Make questions clear and test understanding of key concepts.
-
-Text: {all_text}"""
-            else:
-                prompt = f"""Generate a JSON array of 5-10 questions and answers for a {aid_type} based on the text.
-Format: [{{"question": "...", "answer": "..."}}]
-Make questions clear and answers concise.
-
-Text: {all_text}"""
+        template = QUIZ_PROMPT if aid_type == 'quiz' else FLASHCARD_PROMPT
+        prompt = build_project_prompt('study_aid', template, chunks)
         
         model_config = {"response_mime_type": "application/json"}
         json_model = genai.GenerativeModel(Config.MODEL_NAME, generation_config=model_config)
-        resp = json_model.generate_content(prompt)
-        return jsonify(json.loads(resp.text))
+        resp = json_model.generate_content(prompt, stream=True)
+        parser = JsonArrayStream(schema=QUIZ_ITEM if aid_type == 'quiz' else FLASHCARD_ITEM)
+
+        if data.get('stream'):
+            # Send each question as an NDJSON line as soon as the model finishes it
+            def generate():
+                for item in parser.iter_items(resp):
+                    yield json.dumps(item) + "\n"
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        items = list(parser.iter_items(resp))
+        if not items:
+            return jsonify({'error': 'Failed to generate study aid. Please try again.'}), 500
+        return jsonify(items)
 
     except Exception as e:
         print(f"Study aid error: {e}")
@@ -467,109 +635,54 @@ Text: {all_text}"""
             conn.close()
 
 @app.route('/generate_slides', methods=['POST'])
+@scheduler.limit('render')
 def generate_slides():
     conn = None
     try:
+        data = request.get_json(silent=True) or {}
 
         user_id, project_id = get_user_session()
         
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-
-        cur.execute("""
-            SELECT content FROM documents 
-            WHERE user_id = %s AND project_id = %s
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """, (user_id, project_id))
-        rows = cur.fetchall()
-        cur.close()
+        chunks = fetch_project_chunks(conn, user_id, project_id)
         
-        if not rows:
+        if not chunks:
             return jsonify({'error': 'No content available'}), 400
         
-        all_text = " ".join([row['content'] for row in rows])
-        
-
-        if len(all_text) > 50000:
-            all_text = all_text[:50000]
-            last_period = all_text.rfind('.')
-            if last_period > 40000:
-                all_text = all_text[:last_period + 1]
-        
-
-        prompt = f"""Generate a professional presentation with 6-8 slides based on this content.
-Return ONLY valid JSON in this exact format:
-{{
-    "title": "Main Presentation Title",
-    "slides": [
-        {{
-            "type": "title",
-            "title": "Main Title",
-            "subtitle": "Subtitle text"
-        }},
-        {{
-            "type": "content",
-            "title": "Slide Title",
-            "points": ["Point 1", "Point 2", "Point 3", "Point 4"]
-        }}
-    ]
-}}
-
-Rules:
-- First slide must be type "title" with title and subtitle
-- Other slides must be type "content" with title and 3-5 points
-- Each point should be concise (max 15 words)
-- Make it professional and well-structured
-- Focus on key concepts and important information
-
-Content:
-{all_text}"""
+
+        prompt = build_project_prompt('slides', SLIDES_PROMPT, chunks)
         
         model_config = {"response_mime_type": "application/json"}
         json_model = genai.GenerativeModel(Config.MODEL_NAME, generation_config=model_config)
-        resp = json_model.generate_content(prompt)
-        slide_data = json.loads(resp.text)
-        
-
-        prs = Presentation()
-        prs.slide_width = Inches(10)
-        prs.slide_height = Inches(7.5)
-        
-        for slide_info in slide_data.get('slides', []):
-            if slide_info['type'] == 'title':
-
-                slide_layout = prs.slide_layouts[0]
-                slide = prs.slides.add_slide(slide_layout)
-                title = slide.shapes.title
-                subtitle = slide.placeholders[1]
-                
-                title.text = slide_info.get('title', 'Untitled')
-                subtitle.text = slide_info.get('subtitle', '')
-                
-            elif slide_info['type'] == 'content':
-
-                slide_layout = prs.slide_layouts[1]
-                slide = prs.slides.add_slide(slide_layout)
-                title = slide.shapes.title
-                title.text = slide_info.get('title', 'Slide')
-                
-
-                body_shape = slide.shapes.placeholders[1]
-                text_frame = body_shape.text_frame
-                text_frame.clear()
-                
-                for point in slide_info.get('points', []):
-                    p = text_frame.add_paragraph()
-                    p.text = point
-                    p.level = 0
-                    p.font.size = Pt(18)
-        
+        resp = json_model.generate_content(prompt, stream=True)
+        parser = JsonArrayStream(key='slides', schema=SLIDE_ITEM)
+        from slides import SlideDeck
+        deck = SlideDeck()
+        slides = []
+        for slide_info in parser.iter_items(resp):
+            deck.add(slide_info)
+            slides.append(slide_info)
+        if not slides:
+            return jsonify({'error': 'Failed to generate slides. Please try again.'}), 500
+        document = parser.document if isinstance(parser.document, dict) else {}
+        slide_data = {'title': document.get('title', slides[0]['title']), 'slides': slides}
+        
+        if data.get('format') == 'pptx':
+            # Return the deck itself, built in memory, instead of a link to a saved copy
+            buffer = io.BytesIO()
+            deck.save(buffer)
+            buffer.seek(0)
+            return send_file(
+                buffer,
+                mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation',
+                as_attachment=True,
+                download_name='presentation.pptx'
+            )
 
         ppt_filename = f"presentation_{uuid.uuid4()}.pptx"
         ppt_path = os.path.join("static", ppt_filename)
-        prs.save(ppt_path)
+        deck.save(ppt_path + PART_SUFFIX)
+        os.replace(ppt_path + PART_SUFFIX, ppt_path)
         
 
         return jsonify({
@@ -585,135 +698,53 @@ Content:
             conn.close()
 
 @app.route('/generate_video', methods=['POST'])
+@scheduler.limit('render')
 def generate_video():
     conn = None
+    temp_dir = None
     try:
 
         user_id, project_id = get_user_session()
         
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-
-        cur.execute("""
-            SELECT content FROM documents 
-            WHERE user_id = %s AND project_id = %s
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """, (user_id, project_id))
-        rows = cur.fetchall()
-        cur.close()
+        chunks = fetch_project_chunks(conn, user_id, project_id)
         
-        if not rows:
+        if not chunks:
             return jsonify({'error': 'No content available'}), 400
         
-        all_text = " ".join([row['content'] for row in rows])
-        
-
-        if len(all_text) > 50000:
-            all_text = all_text[:50000]
-            last_period = all_text.rfind('.')
-            if last_period > 40000:
-                all_text = all_text[:last_period + 1]
-        
-
-        video_prompt = f"""Generate a video presentation with 6-8 slides and matching narration.
-Target duration: 3-5 minutes total.
-
-Return ONLY valid JSON in this exact format:
-{{
-    "title": "Main Presentation Title",
-    "slides": [
-        {{
-            "type": "title",
-            "title": "Main Title",
-            "subtitle": "Subtitle text",
-            "narration": "Welcome to this presentation about..."
-        }},
-        {{
-            "type": "content",
-            "title": "Slide Title",
-            "points": ["Point 1", "Point 2", "Point 3"],
-            "narration": "In this section, we'll explore..."
-        }}
-    ]
-}}
-
-Rules:
-- First slide must be type "title" with title, subtitle, and narration
-- Other slides must be type "content" with title, 3-5 points, and narration
-- Each narration should be 15-25 seconds of speech (about 40-65 words)
-- Narration should flow naturally and explain the slide content
-- Keep points concise (max 12 words each)
-- Make it professional and engaging
-
-Content:
-{all_text}"""
+
+        video_prompt = build_project_prompt('video', VIDEO_PROMPT, chunks)
         
         model_config = {"response_mime_type": "application/json"}
         json_model = genai.GenerativeModel(Config.MODEL_NAME, generation_config=model_config)
-        resp = json_model.generate_content(video_prompt)
-        video_data = json.loads(resp.text)
+        resp = json_model.generate_content(video_prompt, stream=True)
         
 
-        temp_dir = "temp_video"
+        # A directory per request, on the same filesystem as static/ so the
+        # finished video can be moved in; concurrent renders never share files
+        os.makedirs("temp_video", exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir="temp_video")
         slide_dir = os.path.join(temp_dir, "slides")
         audio_dir = os.path.join(temp_dir, "audio")
         os.makedirs(slide_dir, exist_ok=True)
         os.makedirs(audio_dir, exist_ok=True)
         
 
-        slide_images = []
-        for i, slide_info in enumerate(video_data.get('slides', [])):
-            img_path = os.path.join(slide_dir, f"slide_{i}.png")
-            create_slide_image(slide_info, img_path)
-            slide_images.append(img_path)
-        
+        # Render and narrate each slide as soon as the model has finished writing it
+        from slides import SlideDeck
+        from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips
 
+        # Frames render on the deck's pool while the narration is synthesized
+        deck = SlideDeck(frame_dir=slide_dir)
         audio_files = []
-        for i, slide_info in enumerate(video_data.get('slides', [])):
-            narration = slide_info.get('narration', '').strip()
-            
-
-            if not narration or len(narration) < 10:
-                print(f"⚠ Slide {i}: No narration text")
-                audio_files.append(None)
-                continue
-            
-
-            narration = narration.replace('"', '').replace("'", "").replace('\n', ' ')
-            narration = ' '.join(narration.split())  
-            
-            audio_path = os.path.join(audio_dir, f"narration_{i}.mp3")
-            audio_success = False
-            
-
-            try:
-                print(f"Trying Edge TTS for slide {i}...")
-                success = asyncio.run(generate_audio_clip(narration, "en-US-GuyNeural", audio_path))
-                if success and os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
-                    audio_files.append(audio_path)
-                    print(f"✓ Edge TTS success for slide {i}")
-                    audio_success = True
-            except Exception as e:
-                print(f"⚠ Edge TTS failed for slide {i}: {str(e)[:100]}")
-            
-
-            if not audio_success:
-                try:
-                    print(f"Trying Google TTS for slide {i}...")
-                    success = generate_audio_with_gtts(narration, audio_path)
-                    if success and os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
-                        audio_files.append(audio_path)
-                        print(f"✓ Google TTS success for slide {i}")
-                        audio_success = True
-                except Exception as e:
-                    print(f"⚠ Google TTS also failed for slide {i}: {str(e)[:100]}")
-            
+        parser = JsonArrayStream(key='slides', schema=SLIDE_ITEM)
+        for i, slide_info in enumerate(parser.iter_items(resp)):
+            deck.add(slide_info)
+            audio_files.append(generate_narration(i, slide_info.get('narration', ''), audio_dir))
+        slide_images = deck.frame_paths()
 
-            if not audio_success:
-                print(f"✗ All audio methods failed for slide {i}, using silent 10s duration")
-                audio_files.append(None)
+        if not slide_images:
+            return jsonify({'error': 'Failed to generate video. Please try again.'}), 500
         
 
         clips = []
@@ -744,8 +775,9 @@ Content:
         video_filename = f"video_overview_{uuid.uuid4()}.mp4"
         video_path = os.path.join("static", video_filename)
         
+        # Encoded outside static/ and moved in once complete
         final_video.write_videofile(
-            video_path,
+            os.path.join(temp_dir, video_filename),
             fps=30, 
             codec='libx264',
             audio_codec='aac',
@@ -756,22 +788,23 @@ Content:
         
 
         video_duration = final_video.duration
+        os.replace(os.path.join(temp_dir, video_filename), video_path)
+        
+        ppt_filename = f"presentation_{uuid.uuid4()}.pptx"
+        ppt_path = os.path.join("static", ppt_filename)
+        deck.save(ppt_path + PART_SUFFIX)
+        os.replace(ppt_path + PART_SUFFIX, ppt_path)
         
 
         final_video.close()
         for clip in clips:
             clip.close()
         
-
-        try:
-            shutil.rmtree(temp_dir)
-        except Exception as cleanup_error:
-            print(f"Cleanup error: {cleanup_error}")
-        
         return jsonify({
             'video_url': f'/static/{video_filename}',
             'duration': float(video_duration),
-            'slides_count': len(slide_images)
+            'slides_count': len(slide_images),
+            'slides_url': f'/static/{ppt_filename}'
         })
     
     except Exception as e:
@@ -782,89 +815,85 @@ Content:
     finally:
         if conn:
             conn.close()
+        if temp_dir:
+            try:
+                shutil.rmtree(temp_dir)
+            except Exception as cleanup_error:
+                print(f"Cleanup error: {cleanup_error}")
 
-
-def create_slide_image(slide_info, output_path, width=2560, height=1440):
-    """Create a slide image from slide data"""
-
-    img = Image.new('RGB', (width, height), color=(255, 255, 255))
-    draw = ImageDraw.Draw(img)
-    
-
+@app.route('/export_project', methods=['GET'])
+@scheduler.limit('ingest')
+def export_project():
+    conn = None
+    snapshot_path = None
     try:
-        title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 480)
-        subtitle_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 360)
-        body_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 340)
-        point_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 220)
-    except:
-
-        title_font = ImageFont.load_default()
-        subtitle_font = ImageFont.load_default()
-        body_font = ImageFont.load_default()
-        point_font = ImageFont.load_default()
-    
-    slide_type = slide_info.get('type', 'content')
-    
-    if slide_type == 'title':
+        user_id, project_id = get_user_session()
 
-        title = slide_info.get('title', 'Title')
-        subtitle = slide_info.get('subtitle', '')
-        
+        fd, snapshot_path = tempfile.mkstemp(suffix='.nbsnap')
+        os.close(fd)
 
-        title_bbox = draw.textbbox((0, 0), title, font=title_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_height = title_bbox[3] - title_bbox[1]
-        title_x = (width - title_width) // 2
-        title_y = height // 2 - 100
-        
-        draw.text((title_x, title_y), title, fill=(0, 0, 0), font=title_font)
-        
+        conn = get_db_connection()
+        count = export_snapshot(conn, user_id, project_id, snapshot_path)
+        print(f"✓ Exported {count} chunks for user: {user_id}, project: {project_id}")
+
+        response = send_file(
+            snapshot_path,
+            mimetype='application/octet-stream',
+            as_attachment=True,
+            download_name=f"{project_id}.nbsnap"
+        )
+        cleanup_path = snapshot_path
+        response.call_on_close(lambda: os.remove(cleanup_path))
+        snapshot_path = None
+        return response
 
-        if subtitle:
-            subtitle_bbox = draw.textbbox((0, 0), subtitle, font=subtitle_font)
-            subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
-            subtitle_x = (width - subtitle_width) // 2
-            subtitle_y = title_y + title_height + 50
-            
-            draw.text((subtitle_x, subtitle_y), subtitle, fill=(80, 80, 80), font=subtitle_font)
-    
-    else:
- 
-        title = slide_info.get('title', 'Slide')
-        points = slide_info.get('points', [])
-        
-  
-        title_y = 120
-        draw.text((100, title_y), title, fill=(0, 0, 0), font=body_font)
-        
- 
-        title_bbox = draw.textbbox((100, title_y), title, font=body_font)
-        title_width = title_bbox[2] - title_bbox[0]
-        draw.rectangle([(100, title_y + 70), (100 + title_width, title_y + 76)], fill=(0, 0, 0))
-        
+    except Exception as e:
+        print(f"Export error: {e}")
+        return jsonify({'error': 'Failed to export project. Please try again.'}), 500
+    finally:
+        if conn:
+            conn.close()
+        if snapshot_path and os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
 
-        y_position = title_y + 140
-        for point in points:
+@app.route('/import_project', methods=['POST'])
+@scheduler.limit('ingest')
+def import_project():
+    conn = None
+    snapshot_path = None
+    try:
+        file = request.files.get('file')
+        if not file:
+            return jsonify({'error': 'No snapshot uploaded'}), 400
 
-            wrapped = textwrap.fill(point, width=110)
-            lines = wrapped.split('\n')
-            
-            for line_idx, line in enumerate(lines):
-                if line_idx == 0:
+        user_id, project_id = get_user_session()
 
-                    draw.ellipse([(120, y_position + 12), (145, y_position + 37)], fill=(0, 0, 0))
+        fd, snapshot_path = tempfile.mkstemp(suffix='.nbsnap')
+        os.close(fd)
+        file.save(snapshot_path)
 
-                    draw.text((170, y_position), line, fill=(0, 0, 0), font=point_font)
-                else:
+        conn = get_db_connection()
+        count = import_snapshot(conn, snapshot_path, user_id, project_id)
+        print(f"✓ Imported {count} chunks for user: {user_id}, project: {project_id}")
 
-                    draw.text((170, y_position), line, fill=(0, 0, 0), font=point_font)
-                
-                y_position += 220
-            
-            y_position += 160  
-    
+        return jsonify({'message': f'Successfully imported {count} chunks'}), 200
+
+    except ValueError as e:
+        print(f"Import error: {e}")
+        if conn:
+            conn.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Import error: {e}")
+        if conn:
+            conn.rollback()
+        return jsonify({'error': 'Failed to import project. Please try again.'}), 500
+    finally:
+        if conn:
+            conn.close()
+        if snapshot_path and os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
 
-    img.save(output_path)
 
 if __name__ == '__main__':
     if not os.path.exists('static'):
@@ -872,5 +901,9 @@ if __name__ == '__main__':
     
 
     init_db()
-    
+
+    # The reloader's child serves requests; resume its jobs without waiting for one
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_resume_loop()
+
     app.run(debug=True, port=8080)
\ No newline at end of file
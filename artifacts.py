@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from functools import lru_cache
+
+from flask import Blueprint, abort, request, send_file
+from werkzeug.utils import safe_join
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Generated artifacts get a fresh uuid in their name and are never rewritten,
+# so browsers may cache them forever. Hand-written assets are versioned by
+# content hash through asset_url() instead.
+GENERATED_ARTIFACT = re.compile(
+    r'^(audio_overview|video_overview|presentation)_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.\w+$'
+)
+# Producers write artifacts under this suffix and rename them into place once
+# complete, and leave an empty marker under FAILED_SUFFIX if they give up;
+# neither is ever served.
+PART_SUFFIX = '.part'
+FAILED_SUFFIX = '.failed'
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+artifacts = Blueprint('artifacts', __name__)
+_compress_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _content_hash(path, mtime):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def asset_url(filename):
+    """URL of a static asset with its content hash, so it can be cached as immutable"""
+    path = os.path.join(Config.STATIC_DIR, filename)
+    try:
+        version = _content_hash(path, os.path.getmtime(path))
+    except OSError:
+        return f'/static/{filename}'
+    return f'/static/{filename}?v={version}'
+
+
+def _precompressed(path, encoding):
+    """Path of a gzip or brotli copy of path, created on first use and when path changes"""
+    relative = os.path.relpath(path, Config.STATIC_DIR)
+    target = os.path.join(Config.COMPRESSED_CACHE_DIR, f"{relative}.{encoding}")
+    source_mtime = os.path.getmtime(path)
+    if os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+        return target
+
+    with _compress_lock:
+        if os.path.exists(target) and os.path.getmtime(target) >= source_mtime:
+            return target
+        with open(path, 'rb') as f:
+            data = f.read()
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=11)
+        else:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp, target)
+    return target
+
+
+def _accepted_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+@artifacts.route('/static/<path:filename>')
+def serve_static(filename):
+    """Static files and generated artifacts with Range, ETag and compression support.
+
+    send_file answers If-None-Match / If-Modified-Since with 304 and Range
+    with 206, so scrubbing a video only fetches the bytes that are needed.
+    """
+    path = safe_join(Config.STATIC_DIR, filename)
+    if path is None or path.endswith((PART_SUFFIX, FAILED_SUFFIX)) or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    encoding = None
+    if mimetype.startswith(COMPRESSIBLE_TYPES) and os.path.getsize(path) >= Config.COMPRESS_MIN_SIZE:
+        encoding = _accepted_encoding()
+
+    send_path = _precompressed(path, encoding) if encoding else path
+    response = send_file(send_path, mimetype=mimetype, conditional=True, etag=True,
+                         download_name=os.path.basename(path))
+
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if mimetype.startswith(COMPRESSIBLE_TYPES):
+        response.vary.add('Accept-Encoding')
+
+    # Only hash when a version was asked for; generated artifacts never need it
+    if GENERATED_ARTIFACT.match(os.path.basename(filename)) or (
+            'v' in request.args and request.args['v'] == _content_hash(path, os.path.getmtime(path))):
+        response.headers['Cache-Control'] = IMMUTABLE
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={Config.STATIC_MAX_AGE}'
+    return response
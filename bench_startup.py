@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+
+from config import Config
+
+# Runs in a fresh interpreter per role, so nothing is shared between measurements
+PROBE = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+import app
+app_seconds = time.perf_counter() - start
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+total_seconds = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'app': app_seconds, 'total': total_seconds, 'rss_mb': rss_kb / 1024}))
+"""
+
+
+def measure(modules, runs=3):
+    """Best of `runs` cold imports of app plus the given modules"""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, *modules],
+            capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return min(results, key=lambda r: r['total'])
+
+
+if __name__ == '__main__':
+    print(f"{'Role':<10}{'app import':>12}{'with role':>12}{'max RSS':>12}")
+    print("-" * 46)
+    for role, modules in Config.ROLE_MODULES.items():
+        result = measure(modules)
+        print(f"{role:<10}{result['app']:>11.2f}s{result['total']:>11.2f}s{result['rss_mb']:>10.0f}MB")
@@ -17,3 +17,99 @@ class Config:
     }
     MODEL_NAME = "gemini-2.5-flash"
     EMBEDDING_MODEL = "models/text-embedding-004"
+    EMBEDDING_DIM = 768
+
+    # Project snapshots
+    SNAPSHOT_BATCH_SIZE = 2000
+    SNAPSHOT_COPY_BUFFER = 1 << 20
+
+    # Prompt budgets (input tokens per route)
+    MODEL_CONTEXT_TOKENS = 1048576
+    CHARS_PER_TOKEN = 4
+    EXACT_TOKEN_COUNT = os.getenv("EXACT_TOKEN_COUNT", "false").lower() == "true"
+    MIN_PARTIAL_CHUNK_TOKENS = 50
+    # Source material shared by the project routes; must fit every one of their budgets
+    PROJECT_CONTEXT_TOKENS = 11000
+    PROMPT_BUDGETS = {
+        "chat": 4000,
+        "summary": 2000,
+        "podcast": 12000,
+        "study_aid": 12000,
+        "slides": 12000,
+        "video": 12000,
+    }
+
+    # Chat conversation memory
+    CHAT_MAX_SESSIONS = 1000
+    CHAT_SESSION_TTL = 3600
+    CHAT_HISTORY_TOKENS = 1000
+    CHAT_KEEP_TURNS = 2
+    CHAT_REUSE_SIMILARITY = 0.8
+
+    # Batch chat
+    # Each query costs one chat token, so this must not exceed the chat burst
+    BATCH_CHAT_MAX_QUERIES = 20
+    BATCH_CHAT_CONCURRENCY = 4
+
+    # Background ingestion
+    UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+    INGEST_WORKERS = 2
+    INGEST_BATCH_SIZE = 50
+    INGEST_MAX_RETRIES = 5
+    INGEST_RETRY_DELAY = 2
+    # Uploads are charged one ingest token, and scheduled, per this many bytes
+    INGEST_COST_BYTES = 5 * 1024 * 1024
+    # Must exceed the longest gap between checkpoints, including embedding retries
+    INGEST_LEASE_SECONDS = 300
+    INGEST_SWEEP_INTERVAL = 60
+    # Jobs that failed on embedding quota are retried by the sweep after this long
+    INGEST_FAILED_RETRY_DELAY = 600
+
+    # Slide decks
+    SLIDE_TEMPLATE = os.getenv("SLIDE_TEMPLATE")
+    SLIDE_RENDER_WORKERS = 4
+
+    # Podcast audio
+    PODCAST_WORKERS = 2
+    PODCAST_TAIL_CHUNK = 64 * 1024
+    PODCAST_TAIL_INTERVAL = 0.25
+    PODCAST_STALL_TIMEOUT = 120
+    # Live podcast streams each hold a worker thread; past this many, clients poll instead
+    PODCAST_MAX_TAILS = 8
+
+    # Static files and generated artifacts
+    STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    COMPRESSED_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static_cache")
+    COMPRESS_MIN_SIZE = 1024
+    STATIC_MAX_AGE = 300
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
+
+    # Rate limits and fair scheduling: kind -> (tokens per second, burst)
+    RATE_LIMITS = {
+        "chat": (1.0, 20),
+        "ingest": (0.2, 10),
+        "render": (1 / 60, 3),
+    }
+    SCHEDULER_WEIGHTS = {"chat": 4, "ingest": 2, "render": 1}
+    SCHEDULER_COSTS = {"chat": 1, "ingest": 2, "render": 10}
+    SCHEDULER_SLOTS = 8
+    # Most slots each kind may hold, so long renders always leave room for chat
+    SCHEDULER_KIND_SLOTS = {"chat": 8, "ingest": 4, "render": 3}
+    # Requests one user may have waiting or running per kind
+    SCHEDULER_USER_CONCURRENCY = {"chat": 4, "ingest": 2, "render": 1}
+    # Client address buckets and caps are this many times a user's, for shared NATs
+    ADDRESS_LIMIT_SCALE = 4
+    # Reverse proxies in front of the app; request.remote_addr comes from X-Forwarded-For
+    TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+    SCHEDULER_MAX_WAITING = 32
+    SCHEDULER_QUEUE_TIMEOUT = 30
+    SCHEDULER_RETRY_AFTER = 10
+    SCHEDULER_MAX_BUCKETS = 10000
+
+    # Worker roles: heavy modules each role needs, and which roles to load at boot
+    ROLE_MODULES = {
+        "chat": [],
+        "ingest": ["ingest", "pypdf"],
+        "render": ["podcast", "slides", "edge_tts", "moviepy.editor"],
+    }
+    WORKER_PRELOAD = [role for role in os.getenv("WORKER_PRELOAD", "").split(",") if role]
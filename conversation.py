@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from prompts import estimate_tokens
+
+
+def cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class Conversation:
+    """History of one chat session: a rolling summary plus the recent turns"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.summary = ""
+        self.turns = []
+        self.retrieval_embedding = None
+        self.retrieval_chunks = []
+        self.retrieval_version = None
+        self.compacting = False
+        self.touched = time.monotonic()
+
+    def reusable_chunks(self, query_embedding, version):
+        """Last retrieved chunks, when the new query is about the same topic as the
+        query that retrieved them and the project has had no documents added since.
+
+        version identifies the project's documents (see project_version in app.py).
+        """
+        if not self.retrieval_chunks or self.retrieval_embedding is None:
+            return None
+        if version != self.retrieval_version:
+            return None
+        if cosine_similarity(query_embedding, self.retrieval_embedding) < Config.CHAT_REUSE_SIMILARITY:
+            return None
+        return self.retrieval_chunks
+
+    def history_text(self, max_tokens=None):
+        """Summary and the most recent turns that fit in max_tokens, formatted for the prompt"""
+        budget = max_tokens or Config.CHAT_HISTORY_TOKENS
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {self.summary}")
+            budget -= estimate_tokens(parts[0])
+
+        recent = []
+        for query, answer in reversed(self.turns):
+            turn = f"User: {query}\nAssistant: {answer}"
+            budget -= estimate_tokens(turn)
+            if budget < 0:
+                break
+            recent.append(turn)
+        parts.extend(reversed(recent))
+
+        if not parts:
+            return ""
+        return "Conversation so far:\n" + "\n\n".join(parts) + "\n\n"
+
+    def history_tokens(self):
+        turns = "".join(query + answer for query, answer in self.turns)
+        return estimate_tokens(self.summary + turns)
+
+    def remember_retrieval(self, query_embedding, chunks, version):
+        """Record a retrieval; turns that reuse its chunks leave it unchanged"""
+        self.retrieval_embedding = query_embedding
+        self.retrieval_chunks = chunks
+        self.retrieval_version = version
+
+    def add_turn(self, query, answer):
+        self.turns.append((query, answer))
+        self.touched = time.monotonic()
+
+    def needs_compaction(self):
+        return (not self.compacting and len(self.turns) > Config.CHAT_KEEP_TURNS
+                and self.history_tokens() > Config.CHAT_HISTORY_TOKENS)
+
+    def compact(self, summarize):
+        """Fold all but the most recent turns into the rolling summary.
+
+        summarize(previous_summary, turns) returns the new summary text. It
+        runs without holding the lock so the session keeps serving requests.
+        """
+        with self.lock:
+            if self.compacting:
+                return
+            self.compacting = True
+            old_turns = self.turns[:-Config.CHAT_KEEP_TURNS]
+            previous = self.summary
+        try:
+            summary = summarize(previous, old_turns)
+            with self.lock:
+                self.summary = summary
+                self.turns = self.turns[len(old_turns):]
+                self.compacting = False
+        except Exception as e:
+            print(f"Conversation summary error: {e}")
+            with self.lock:
+                # Keep the history bounded even when summarising fails
+                self.turns = self.turns[len(old_turns):]
+                self.compacting = False
+
+
+class ConversationStore:
+    """Bounded in-process store of conversations, evicting the least recently used"""
+
+    def __init__(self, max_sessions=None, ttl=None):
+        self.max_sessions = max_sessions or Config.CHAT_MAX_SESSIONS
+        self.ttl = ttl or Config.CHAT_SESSION_TTL
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._sessions.get(key)
+            if conversation is None or now - conversation.touched > self.ttl:
+                conversation = Conversation()
+                self._sessions[key] = conversation
+            self._sessions.move_to_end(key)
+            conversation.touched = now
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return conversation
+
+    def reset(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
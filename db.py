@@ -0,0 +1,115 @@
+import psycopg2
+
+from config import Config
+
+# Bump when init_db gains new DDL so existing databases are upgraded on next boot
+SCHEMA_VERSION = 2
+
+
+def get_db_connection():
+    """Connect to Supabase PostgreSQL with connection pooling"""
+    conn = psycopg2.connect(
+        Config.DATABASE_URL,
+        sslmode='require',
+        connect_timeout=10
+    )
+    return conn
+
+
+def _schema_version(cur):
+    cur.execute("SELECT to_regclass('schema_version')")
+    if cur.fetchone()[0] is None:
+        return 0
+    cur.execute("SELECT version FROM schema_version")
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def init_db(force=False):
+    """Initialize database with required table and pgvector extension.
+
+    The DDL only runs when the recorded schema version is older than
+    SCHEMA_VERSION, so a normal boot costs one small query.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        
+        if not force and _schema_version(cur) >= SCHEMA_VERSION:
+            cur.close()
+            print("✓ Database schema is up to date")
+            return
+        
+
+        cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        
+
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id SERIAL PRIMARY KEY,
+                content TEXT NOT NULL,
+                metadata JSONB,
+                embedding vector(768),
+                user_id TEXT NOT NULL DEFAULT 'default_user',
+                project_id TEXT NOT NULL DEFAULT 'default_project',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS documents_embedding_idx 
+            ON documents USING ivfflat (embedding vector_cosine_ops)
+            WITH (lists = 100)
+        """)
+        
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_project 
+            ON documents(user_id, project_id)
+        """)
+        
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_created_at 
+            ON documents(created_at DESC)
+        """)
+        
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                project_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                storage_path TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                total_chunks INTEGER,
+                processed_chunks INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ingest_jobs_user_project 
+            ON ingest_jobs(user_id, project_id)
+        """)
+        
+        cur.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+        cur.execute("DELETE FROM schema_version")
+        cur.execute("INSERT INTO schema_version (version) VALUES (%s)", (SCHEMA_VERSION,))
+        
+        conn.commit()
+        cur.close()
+        print("✓ Database initialized successfully on Supabase")
+    except Exception as e:
+        print(f"Database initialization: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    init_db(force=True)
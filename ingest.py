@@ -0,0 +1,274 @@
+import io
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+import google.generativeai as genai
+from psycopg2.extras import RealDictCursor, execute_values
+
+from config import Config
+from db import get_db_connection
+from scheduler import FairExecutor
+
+# Jobs move pending -> processing -> done, or to failed with processed_chunks
+# kept as the checkpoint; resuming a job continues from that chunk. A worker
+# claims a job atomically and holds it for INGEST_LEASE_SECONDS, renewed by
+# every checkpoint, so any number of processes can sweep for unfinished jobs:
+# a processing job is only taken over once its lease has expired, and each
+# batch is committed only if the checkpoint it started from is still current.
+# Jobs start in fair order per user, costed by file size, so one user's large
+# uploads cannot hold the workers while everyone else's wait.
+_executor = FairExecutor(Config.INGEST_WORKERS, "ingest")
+_active_jobs = set()
+_active_lock = threading.Lock()
+_sweep_started = False
+
+
+def chunk_text(text, chunk_size=1000, overlap=200):
+    chunks = []
+    start = 0
+    text_len = len(text)
+    while start < text_len:
+        end = min(start + chunk_size, text_len)
+        chunks.append(text[start:end])
+        start += (chunk_size - overlap)
+    return chunks
+
+
+def extract_text(filename, data):
+    if filename.endswith('.pdf'):
+        import pypdf
+        pdf_reader = pypdf.PdfReader(io.BytesIO(data))
+        text_content = ""
+        for page in pdf_reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text_content += page_text
+        return text_content
+    return data.decode('utf-8')
+
+
+def _storage_path(job_id):
+    return os.path.join(Config.UPLOAD_DIR, job_id)
+
+
+def job_cost(size_bytes):
+    """Scheduling cost of ingesting size_bytes of upload, at least 1"""
+    return max(1, math.ceil(size_bytes / Config.INGEST_COST_BYTES))
+
+
+def create_job(conn, user_id, project_id, file):
+    """Store an uploaded file's raw bytes and record a pending ingest job"""
+    job_id = uuid.uuid4().hex
+    os.makedirs(Config.UPLOAD_DIR, exist_ok=True)
+    storage_path = _storage_path(job_id)
+    file.save(storage_path)
+
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO ingest_jobs (id, user_id, project_id, filename, storage_path) VALUES (%s, %s, %s, %s, %s)",
+        (job_id, user_id, project_id, file.filename, storage_path)
+    )
+    conn.commit()
+    cur.close()
+    return job_id
+
+
+def get_jobs(conn, user_id, project_id, job_id=None):
+    """Progress of a project's ingest jobs, newest first"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    query = """
+        SELECT id, filename, status, total_chunks, processed_chunks, error,
+               (status = 'processing' AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s)) AS stalled
+        FROM ingest_jobs
+        WHERE user_id = %s AND project_id = %s
+    """
+    params = [Config.INGEST_LEASE_SECONDS, user_id, project_id]
+    if job_id:
+        query += " AND id = %s"
+        params.append(job_id)
+    cur.execute(query + " ORDER BY created_at DESC", params)
+    jobs = cur.fetchall()
+    cur.close()
+    return jobs
+
+
+def _set_status(cur, job_id, checkpoint, status, error=None):
+    """Finish a claimed job, unless another worker has since moved it past our checkpoint"""
+    cur.execute("""
+        UPDATE ingest_jobs SET status = %s, error = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND status = 'processing' AND processed_chunks = %s
+    """, (status, error, job_id, checkpoint))
+
+
+def embed_batch(chunks):
+    """Embed a batch of chunks in one request, backing off on quota errors"""
+    for attempt in range(Config.INGEST_MAX_RETRIES + 1):
+        try:
+            embedding_result = genai.embed_content(
+                model=Config.EMBEDDING_MODEL,
+                content=chunks,
+                task_type="retrieval_document"
+            )
+            break
+        except Exception as e:
+            error_msg = str(e)
+            if attempt == Config.INGEST_MAX_RETRIES or not ("429" in error_msg or "quota" in error_msg.lower()):
+                raise
+            delay = Config.INGEST_RETRY_DELAY * (2 ** attempt)
+            print(f"Embedding quota exceeded, retrying in {delay}s")
+            time.sleep(delay)
+
+    embeddings = embedding_result['embedding']
+    for embedding in embeddings:
+        if len(embedding) != Config.EMBEDDING_DIM:
+            raise ValueError(f"Unexpected embedding dimension: {len(embedding)}")
+    return embeddings
+
+
+def process_job(job_id):
+    """Embed a job's remaining chunks, committing progress after every batch"""
+    conn = None
+    checkpoint = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("""
+            UPDATE ingest_jobs SET status = 'processing', error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND (
+                status IN ('pending', 'failed')
+                OR (status = 'processing' AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            )
+            RETURNING *
+        """, (job_id, Config.INGEST_LEASE_SECONDS))
+        job = cur.fetchone()
+        conn.commit()
+        if not job:
+            return
+        checkpoint = job['processed_chunks']
+
+        with open(job['storage_path'], 'rb') as f:
+            text_content = extract_text(job['filename'], f.read())
+
+        if not text_content.strip():
+            _set_status(cur, job_id, checkpoint, 'failed', 'No text content found in file')
+            conn.commit()
+            return
+
+        chunks = chunk_text(text_content)
+        cur.execute(
+            "UPDATE ingest_jobs SET total_chunks = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+            (len(chunks), job_id)
+        )
+        conn.commit()
+
+        metadata = json.dumps({'filename': job['filename'], 'ingest_job': job_id})
+        for start in range(checkpoint, len(chunks), Config.INGEST_BATCH_SIZE):
+            batch = chunks[start:start + Config.INGEST_BATCH_SIZE]
+            embeddings = embed_batch(batch)
+
+            # Chunks and checkpoint commit together, and only while the checkpoint
+            # is still ours, so a job never writes duplicate rows
+            execute_values(
+                cur,
+                "INSERT INTO documents (content, metadata, embedding, user_id, project_id) VALUES %s",
+                [(chunk, metadata, embedding, job['user_id'], job['project_id'])
+                 for chunk, embedding in zip(batch, embeddings)]
+            )
+            cur.execute("""
+                UPDATE ingest_jobs SET processed_chunks = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND processed_chunks = %s
+            """, (start + len(batch), job_id, checkpoint))
+            if cur.rowcount == 0:
+                conn.rollback()
+                cur.close()
+                print(f"Ingest job {job_id} was taken over by another worker, stopping")
+                return
+            conn.commit()
+            checkpoint = start + len(batch)
+
+        _set_status(cur, job_id, checkpoint, 'done')
+        conn.commit()
+        cur.close()
+
+        try:
+            os.remove(job['storage_path'])
+        except OSError:
+            pass
+
+        print(f"✓ Ingested {len(chunks)} chunks from {job['filename']} for user: {job['user_id']}, project: {job['project_id']}")
+
+    except Exception as e:
+        print(f"Ingest error for job {job_id}: {e}")
+        if conn and checkpoint is not None:
+            conn.rollback()
+            cur = conn.cursor()
+            _set_status(cur, job_id, checkpoint, 'failed', str(e)[:500])
+            conn.commit()
+            cur.close()
+    finally:
+        if conn:
+            conn.close()
+        with _active_lock:
+            _active_jobs.discard(job_id)
+
+
+def submit_job(job_id, user_id):
+    """Queue a job on the background workers unless it is already running here"""
+    with _active_lock:
+        if job_id in _active_jobs:
+            return
+        _active_jobs.add(job_id)
+    try:
+        size = os.path.getsize(_storage_path(job_id))
+    except OSError:
+        size = 0
+    _executor.submit(user_id, job_cost(size), process_job, job_id)
+
+
+def resume_jobs():
+    """Requeue pending jobs, jobs whose worker stopped renewing its lease, and
+    jobs that ran out of quota retries once INGEST_FAILED_RETRY_DELAY has passed"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, user_id FROM ingest_jobs
+            WHERE status = 'pending'
+            OR (status = 'processing' AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            OR (status = 'failed' AND (error LIKE '%%429%%' OR error ILIKE '%%quota%%')
+                AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            ORDER BY created_at
+        """, (Config.INGEST_LEASE_SECONDS, Config.INGEST_FAILED_RETRY_DELAY))
+        jobs = cur.fetchall()
+        cur.close()
+        for job_id, user_id in jobs:
+            submit_job(job_id, user_id)
+        if jobs:
+            print(f"✓ Resumed {len(jobs)} ingest jobs")
+    except Exception as e:
+        print(f"Resume ingest jobs: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def _sweep():
+    while True:
+        resume_jobs()
+        time.sleep(Config.INGEST_SWEEP_INTERVAL)
+
+
+def start_resume_loop():
+    """Resume unfinished jobs now and every INGEST_SWEEP_INTERVAL seconds after;
+    only the first call in a process starts the sweep"""
+    global _sweep_started
+    with _active_lock:
+        if _sweep_started:
+            return
+        _sweep_started = True
+    threading.Thread(target=_sweep, daemon=True).start()
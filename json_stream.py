@@ -0,0 +1,228 @@
+import json
+
+# Minimal schemas for the items the study aid, slide and podcast prompts ask for:
+# required key -> expected type. Items that do not match are dropped, not fatal.
+QUIZ_ITEM = {'question': str, 'options': list, 'answer': str}
+FLASHCARD_ITEM = {'question': str, 'answer': str}
+SLIDE_ITEM = {'type': str, 'title': str}
+PODCAST_TURN = {'speaker': str, 'text': str}
+
+
+def _close_json(text):
+    """Drop trailing commas and close any open string, object or array"""
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    for c in text:
+        if in_string:
+            out.append(c)
+            if escape:
+                escape = False
+            elif c == '\\':
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+        if c in '}]':
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            if stack:
+                stack.pop()
+        elif c in '{[':
+            stack.append('}' if c == '{' else ']')
+        elif c == '"':
+            in_string = True
+        out.append(c)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    while out and (out[-1].isspace() or out[-1] == ','):
+        out.pop()
+    if out and out[-1] == ':':
+        out.append('null')
+    return ''.join(out) + ''.join(reversed(stack))
+
+
+def _strip_fences(text):
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+    if text.endswith('```'):
+        text = text[:-3]
+    return text.strip()
+
+
+def repair_json(text, max_attempts=20):
+    """Best effort parse of malformed or truncated JSON from a model.
+
+    Closes open strings and brackets, and when that is not enough keeps
+    cutting back to the previous comma, dropping the damaged trailing element.
+    Raises ValueError if nothing usable is left.
+    """
+    text = _strip_fences(text)
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if not starts:
+        raise ValueError("No JSON found in model output")
+    attempt = text[min(starts):]
+
+    for _ in range(max_attempts):
+        try:
+            return json.loads(_close_json(attempt))
+        except json.JSONDecodeError:
+            cut = attempt.rfind(',')
+            if cut <= 0:
+                break
+            attempt = attempt[:cut]
+    raise ValueError("Could not repair JSON from model output")
+
+
+def parse_json(text):
+    """json.loads, falling back to repair_json"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        print(f"Repairing malformed JSON: {e}")
+        return repair_json(text)
+
+
+def validate_item(item, schema):
+    if schema is None:
+        return True
+    if not isinstance(item, dict):
+        return False
+    return all(isinstance(item.get(key), kind) for key, kind in schema.items())
+
+
+class JsonArrayStream:
+    """Incremental parser emitting the elements of one JSON array as they complete.
+
+    With key=None the target is the top-level array; otherwise it is the array
+    stored under that key of the top-level object (e.g. "slides"). Feed it
+    text as the model streams it, and call finish() once the stream ends.
+    """
+
+    def __init__(self, key=None, schema=None):
+        self.key = key
+        self.schema = schema
+        self.text = ""
+        self._pos = 0
+        self._stack = []
+        self._keys = {}
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._target_depth = None
+        self._item_start = None
+        self._done = False
+        self.document = None
+
+    def _is_target(self):
+        depth = len(self._stack)
+        if self.key is None:
+            return depth == 1
+        return depth == 2 and self._stack[0] == '{' and self._keys.get(1) == self.key
+
+    def _emit(self, raw, items):
+        try:
+            item = parse_json(raw)
+        except ValueError as e:
+            print(f"Skipping unparseable item: {e}")
+            return
+        if validate_item(item, self.schema):
+            items.append(item)
+        else:
+            print(f"Skipping item that does not match schema: {raw[:100]}")
+
+    def feed(self, chunk):
+        """Add streamed text; returns the items completed by it"""
+        items = []
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            if self._done:
+                break
+            c = text[i]
+            in_target = self._target_depth is not None and len(self._stack) == self._target_depth
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if in_target and self._item_start is None:
+                    self._item_start = i
+            elif c in '{[':
+                if in_target and self._item_start is None:
+                    self._item_start = i
+                self._stack.append(c)
+                if c == '[' and self._target_depth is None and self._is_target():
+                    self._target_depth = len(self._stack)
+            elif c in '}]':
+                if self._stack:
+                    self._stack.pop()
+                depth = len(self._stack)
+                if self._target_depth is None:
+                    continue
+                if depth == self._target_depth and self._item_start is not None:
+                    self._emit(text[self._item_start:i + 1], items)
+                    self._item_start = None
+                elif depth == self._target_depth - 1:
+                    if self._item_start is not None:
+                        self._emit(text[self._item_start:i], items)
+                        self._item_start = None
+                    self._done = True
+            elif c == ':':
+                if self._stack and self._stack[-1] == '{':
+                    self._keys[len(self._stack)] = self._last_string
+            elif c == ',':
+                if in_target and self._item_start is not None:
+                    self._emit(text[self._item_start:i], items)
+                    self._item_start = None
+            elif not c.isspace() and in_target and self._item_start is None:
+                self._item_start = i
+        self._pos = len(text)
+        return items
+
+    def finish(self):
+        """Flush a truncated last item; returns (remaining items, whole document).
+
+        The document is the repaired parse of everything fed, or None if even
+        repair fails. It is also kept on self.document.
+        """
+        items = []
+        if self._item_start is not None and not self._done:
+            self._emit(self.text[self._item_start:], items)
+            self._item_start = None
+        try:
+            document = parse_json(self.text)
+        except ValueError as e:
+            print(f"Could not parse model output: {e}")
+            document = None
+        self.document = document
+        return items, document
+
+    def iter_items(self, response):
+        """Yield validated items from a streamed Gemini response as they complete"""
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks carrying only a finish reason or safety info have no text
+                continue
+            yield from self.feed(text)
+        items, _ = self.finish()
+        yield from items
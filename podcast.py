@@ -0,0 +1,197 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+
+import edge_tts
+
+from artifacts import FAILED_SUFFIX, PART_SUFFIX
+from config import Config
+from json_stream import JsonArrayStream, PODCAST_TURN
+from scheduler import FairExecutor
+
+HOST_VOICES = {
+    "Host A": "en-US-GuyNeural",
+    "Host B": "en-US-JennyNeural",
+}
+
+# Podcasts start in fair order per user, so one user's queue cannot hold the workers
+_executor = FairExecutor(Config.PODCAST_WORKERS, "podcast")
+# Part files of this process's queued and running podcasts. Their mtime is
+# refreshed well within PODCAST_STALL_TIMEOUT, so a part file left older than
+# that belongs to a process that died and is reported, by any process, as failed.
+_owned = set()
+_owned_lock = threading.Lock()
+_heartbeat_started = False
+
+
+def _produce_turns(script_response, turns):
+    """Parse dialogue turns off the streamed script into a queue, ending with None"""
+    try:
+        for turn in JsonArrayStream(schema=PODCAST_TURN).iter_items(script_response):
+            turns.put(turn)
+    except Exception as e:
+        print(f"Podcast script error: {e}")
+    finally:
+        turns.put(None)
+
+
+def _iter_tts(loop, text, voice):
+    """Yield MP3 bytes for one turn as Edge TTS sends them"""
+    stream = edge_tts.Communicate(text, voice).stream()
+    try:
+        while True:
+            try:
+                chunk = loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                return
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+    except Exception as e:
+        print(f"Audio generation error: {e}")
+    finally:
+        loop.run_until_complete(stream.aclose())
+
+
+def stream_podcast(script_response, output_path):
+    """Yield podcast MP3 bytes while the script is still being written.
+
+    The script is parsed on a background thread; each turn is sent to TTS
+    as soon as it is complete, and its audio is appended to the part file
+    and yielded as it arrives. Edge TTS returns every voice in the same MP3
+    format, so clips are joined frame by frame with no decode or re-encode.
+    The part file is renamed to output_path only if the podcast completes
+    with some audio, and removed otherwise, so the published URL never
+    serves a partial file.
+    """
+    turns = queue.Queue()
+    threading.Thread(target=_produce_turns, args=(script_response, turns), daemon=True).start()
+
+    part_path = output_path + PART_SUFFIX
+    audio_bytes = 0
+    loop = asyncio.new_event_loop()
+    try:
+        with open(part_path, 'wb') as out:
+            while True:
+                turn = turns.get()
+                if turn is None:
+                    break
+                text = turn['text'].strip()
+                if not text:
+                    continue
+                voice = HOST_VOICES.get(turn['speaker'], HOST_VOICES["Host B"])
+                for audio in _iter_tts(loop, text, voice):
+                    out.write(audio)
+                    out.flush()
+                    audio_bytes += len(audio)
+                    yield audio
+        if audio_bytes:
+            os.replace(part_path, output_path)
+    finally:
+        loop.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def _mark_failed(output_path):
+    open(output_path + FAILED_SUFFIX, 'wb').close()
+
+
+def _heartbeat():
+    while True:
+        time.sleep(Config.PODCAST_STALL_TIMEOUT / 4)
+        with _owned_lock:
+            part_paths = list(_owned)
+        for part_path in part_paths:
+            try:
+                os.utime(part_path)
+            except OSError:
+                pass
+
+
+def _generate(script_response, output_path):
+    try:
+        for _ in stream_podcast(script_response, output_path):
+            pass
+    except Exception as e:
+        print(f"Podcast generation error: {e}")
+    finally:
+        with _owned_lock:
+            _owned.discard(output_path + PART_SUFFIX)
+        if not os.path.exists(output_path):
+            _mark_failed(output_path)
+
+
+def start_podcast(script_response, output_path, user_id):
+    """Generate a podcast on the background workers; follow it with tail_podcast"""
+    global _heartbeat_started
+    # Create the part file now so the job reads as running while it is queued
+    part_path = output_path + PART_SUFFIX
+    open(part_path, 'wb').close()
+    with _owned_lock:
+        _owned.add(part_path)
+        if not _heartbeat_started:
+            _heartbeat_started = True
+            threading.Thread(target=_heartbeat, daemon=True).start()
+    _executor.submit(user_id, 1, _generate, script_response, output_path)
+
+
+def podcast_status(output_path):
+    """'done', 'running', 'failed', or 'missing' if no podcast was started at output_path"""
+    part_path = output_path + PART_SUFFIX
+    if os.path.exists(output_path):
+        return 'done'
+    try:
+        stale = time.time() - os.path.getmtime(part_path) > Config.PODCAST_STALL_TIMEOUT
+    except OSError:
+        stale = None
+    if stale is False:
+        return 'running'
+    if stale:
+        print(f"Podcast owner stopped, marking failed: {part_path}")
+        _mark_failed(output_path)
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+    if os.path.exists(output_path + FAILED_SUFFIX):
+        return 'failed'
+    # The part file may have just been renamed into place
+    return 'done' if os.path.exists(output_path) else 'missing'
+
+
+def tail_podcast(output_path):
+    """Bytes of a podcast from the start, following the part file while it grows.
+
+    Only the files are shared with the generator, so any worker can serve
+    the tail and a re-fetch just reads again; it never starts a new podcast.
+    Raises FileNotFoundError if the podcast failed or was never started.
+    """
+    part_path = output_path + PART_SUFFIX
+    try:
+        f = open(part_path, 'rb')
+    except FileNotFoundError:
+        f = open(output_path, 'rb')
+    return _follow(f, part_path)
+
+
+def _follow(f, part_path):
+    with f:
+        idle = 0.0
+        while True:
+            data = f.read(Config.PODCAST_TAIL_CHUNK)
+            if data:
+                idle = 0.0
+                yield data
+                continue
+            if not os.path.exists(part_path):
+                # Renamed or removed; the open handle still reaches everything written
+                for data in iter(lambda: f.read(Config.PODCAST_TAIL_CHUNK), b''):
+                    yield data
+                return
+            if idle >= Config.PODCAST_STALL_TIMEOUT:
+                print(f"Podcast stalled, ending stream: {part_path}")
+                return
+            time.sleep(Config.PODCAST_TAIL_INTERVAL)
+            idle += Config.PODCAST_TAIL_INTERVAL
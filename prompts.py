@@ -0,0 +1,227 @@
+import math
+from functools import lru_cache
+
+from config import Config
+
+# Chat and summary templates keep their static instructions first. The project
+# routes (podcast, study aids, slides, video) instead share one large prefix: the
+# project's source material, packed to the same size for every route, followed by
+# the route's own instructions. Consecutive generations over a project then start
+# with thousands of identical tokens, which Gemini's implicit cache can reuse.
+PROJECT_CONTEXT_PROMPT = """Source material:
+{context}
+
+"""
+
+CHAT_PROMPT = """You are a helpful assistant. Answer the user question strictly based on the provided context.
+
+{history}Context:
+{context}
+
+Question: {query}
+
+Answer:"""
+
+PODCAST_PROMPT = """Generate a podcast script between two hosts (Host A and Host B) discussing the source material above.
+Make it conversational, engaging, and use simple English. Keep it concise (max 8-10 exchanges).
+Format as JSON: [{{"speaker": "Host A", "text": "..."}}, {{"speaker": "Host B", "text": "..."}}].
+"""
+
+SUMMARY_PROMPT = """Summarize this conversation between a user and an assistant in at most 150 words.
+Keep the topics discussed, facts established and any open questions.
+
+{context}
+
+Summary:"""
+
+FLOWCHART_PROMPT = """Generate Mermaid.js code representing the key concepts and their relationships in the source material above.
+Return ONLY the mermaid code starting with 'graph TD' or 'graph LR'. Do not include markdown code fences or any other text."""
+
+QUIZ_PROMPT = """Generate a JSON array of 5-7 multiple choice questions based on the source material above.
+Each question should have:
+- question: the question text
+- options: array of 4 possible answers
+- answer: the correct answer (must be one of the options)
+- explanation: brief explanation of why this is correct (1-2 sentences)
+- wrongExplanation: brief explanation shown for wrong answers (1-2 sentences)
+
+Format: [{{"question": "...", "options": ["A", "B", "C", "D"], "answer": "A", "explanation": "...", "wrongExplanation": "..."}}]
+Make questions clear and test understanding of key concepts."""
+
+FLASHCARD_PROMPT = """Generate a JSON array of 5-10 questions and answers for a flashcard based on the source material above.
+Format: [{{"question": "...", "answer": "..."}}]
+Make questions clear and answers concise."""
+
+SLIDES_PROMPT = """Generate a professional presentation with 6-8 slides based on the source material above.
+Return ONLY valid JSON in this exact format:
+{{
+    "title": "Main Presentation Title",
+    "slides": [
+        {{
+            "type": "title",
+            "title": "Main Title",
+            "subtitle": "Subtitle text"
+        }},
+        {{
+            "type": "content",
+            "title": "Slide Title",
+            "points": ["Point 1", "Point 2", "Point 3", "Point 4"]
+        }}
+    ]
+}}
+
+Rules:
+- First slide must be type "title" with title and subtitle
+- Other slides must be type "content" with title and 3-5 points
+- Each point should be concise (max 15 words)
+- Make it professional and well-structured
+- Focus on key concepts and important information"""
+
+VIDEO_PROMPT = """Generate a video presentation with 6-8 slides and matching narration, based on the source material above.
+Target duration: 3-5 minutes total.
+
+Return ONLY valid JSON in this exact format:
+{{
+    "title": "Main Presentation Title",
+    "slides": [
+        {{
+            "type": "title",
+            "title": "Main Title",
+            "subtitle": "Subtitle text",
+            "narration": "Welcome to this presentation about..."
+        }},
+        {{
+            "type": "content",
+            "title": "Slide Title",
+            "points": ["Point 1", "Point 2", "Point 3"],
+            "narration": "In this section, we'll explore..."
+        }}
+    ]
+}}
+
+Rules:
+- First slide must be type "title" with title, subtitle, and narration
+- Other slides must be type "content" with title, 3-5 points, and narration
+- Each narration should be 15-25 seconds of speech (about 40-65 words)
+- Narration should flow naturally and explain the slide content
+- Keep points concise (max 12 words each)
+- Make it professional and engaging"""
+
+_token_model = None
+
+
+class PromptTooLong(ValueError):
+    """The request's own fields leave no room for context in the route budget"""
+
+
+def estimate_tokens(text):
+    """Cheap local token estimate, used for packing"""
+    return math.ceil(len(text) / Config.CHARS_PER_TOKEN)
+
+
+def count_tokens(text):
+    """Exact token count from the Gemini API when enabled, local estimate otherwise"""
+    global _token_model
+    if not Config.EXACT_TOKEN_COUNT:
+        return estimate_tokens(text)
+    if _token_model is None:
+        import google.generativeai as genai
+        _token_model = genai.GenerativeModel(Config.MODEL_NAME)
+    return _token_model.count_tokens(text).total_tokens
+
+
+class _EmptyFields(dict):
+    def __missing__(self, key):
+        return ''
+
+
+@lru_cache(maxsize=64)
+def _template_tokens(template):
+    """Token cost of a template's static text, cached per template"""
+    return estimate_tokens(template.format_map(_EmptyFields()))
+
+
+def route_budget(route):
+    """Input token budget for a route, capped by what the model can accept"""
+    max_input = Config.MODEL_CONTEXT_TOKENS - Config.GENERATION_CONFIG['max_output_tokens']
+    return min(Config.PROMPT_BUDGETS[route], max_input)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens, preferring to end on a sentence"""
+    max_chars = int(max_tokens * Config.CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    text = text[:max_chars]
+    last_period = text.rfind('.')
+    if last_period > max_chars * 0.8:
+        text = text[:last_period + 1]
+    return text
+
+
+def pack_context(chunks, max_tokens, separator="\n\n"):
+    """Take chunks in priority order until max_tokens is used up.
+
+    Chunks should already be sorted most relevant first. The chunk that
+    crosses the budget is truncated rather than dropped.
+    """
+    packed = []
+    used = 0
+    sep_tokens = estimate_tokens(separator)
+    for chunk in chunks:
+        cost = estimate_tokens(chunk) + (sep_tokens if packed else 0)
+        if used + cost > max_tokens:
+            remaining = max_tokens - used - (sep_tokens if packed else 0)
+            if remaining > Config.MIN_PARTIAL_CHUNK_TOKENS:
+                packed.append(truncate_to_tokens(chunk, remaining))
+            break
+        packed.append(chunk)
+        used += cost
+    return separator.join(packed)
+
+
+def build_prompt(route, template, chunks, separator="\n\n", **fields):
+    """Fill a template, packing as much context as the route budget allows.
+
+    The template's static text and the extra fields (e.g. the user query) are
+    charged against the budget first; the rest goes to {context}. Raises
+    PromptTooLong when the fields leave no room for context.
+    """
+    budget = route_budget(route)
+    fixed = _template_tokens(template) + sum(estimate_tokens(str(v)) for v in fields.values())
+    context_budget = budget - fixed
+    if context_budget < Config.MIN_PARTIAL_CHUNK_TOKENS:
+        raise PromptTooLong("Request is too long. Please shorten it and try again.")
+
+    prompt = template.format(context=pack_context(chunks, context_budget, separator), **fields)
+
+    if Config.EXACT_TOKEN_COUNT:
+        # The estimate can undershoot for dense text; shrink the context once if needed
+        actual = count_tokens(prompt)
+        if actual > budget:
+            context_budget = int(context_budget * budget / actual)
+            prompt = template.format(context=pack_context(chunks, context_budget, separator), **fields)
+
+    return prompt
+
+
+def build_project_prompt(route, template, chunks, separator=" "):
+    """Project source material first, then the route's instructions.
+
+    The context is packed to PROJECT_CONTEXT_TOKENS whatever the route, so
+    every project route sends the same prefix for the same chunks.
+    """
+    context_budget = Config.PROJECT_CONTEXT_TOKENS
+    if context_budget + _template_tokens(template) > route_budget(route):
+        raise ValueError(f"PROJECT_CONTEXT_TOKENS does not fit the {route} budget")
+
+    prefix = PROJECT_CONTEXT_PROMPT.format(context=pack_context(chunks, context_budget, separator))
+
+    if Config.EXACT_TOKEN_COUNT:
+        # Shrink against the prefix alone so the result does not depend on the route
+        actual = count_tokens(prefix)
+        if actual > context_budget:
+            context_budget = int(context_budget * context_budget / actual)
+            prefix = PROJECT_CONTEXT_PROMPT.format(context=pack_context(chunks, context_budget, separator))
+
+    return prefix + template.format()
@@ -0,0 +1,338 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, make_response, request
+
+from config import Config
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, cost=1):
+        """Spend cost tokens; returns 0 on success or the seconds until they are available.
+
+        A cost above burst can never be paid, so callers check max_cost first.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per (kind, key), kept in a bounded LRU.
+
+    Each key carries a scale applied to the kind's rate and burst, so a
+    client address shared by several users can get a larger allowance.
+    """
+
+    def __init__(self, limits, max_buckets):
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def max_cost(self, kind, keys):
+        """Largest cost every key's bucket can ever pay at once"""
+        return self.limits[kind][1] * min(keys.values())
+
+    def take(self, kind, keys, cost=1):
+        """Charge every key's bucket for kind; returns 0 or the longest wait needed.
+
+        keys maps each key to its scale. Nothing is charged unless all
+        buckets can pay, so a rejected request does not use up the caller's
+        allowance.
+        """
+        rate, burst = self.limits[kind]
+        with self._lock:
+            buckets = []
+            for key, scale in keys.items():
+                bucket = self._buckets.get((kind, key))
+                if bucket is None:
+                    bucket = TokenBucket(rate * scale, burst * scale)
+                    self._buckets[(kind, key)] = bucket
+                self._buckets.move_to_end((kind, key))
+                buckets.append(bucket)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+
+            snapshot = [(b.tokens, b.updated) for b in buckets]
+            waits = [b.take(cost) for b in buckets]
+            retry_after = max(waits)
+            if retry_after:
+                for bucket, (tokens, updated) in zip(buckets, snapshot):
+                    bucket.tokens, bucket.updated = tokens, updated
+            return retry_after
+
+
+def _forget_finished(last_finish, virtual_time):
+    """Drop flows whose last tag has passed; they would restart at virtual_time anyway"""
+    for flow in [flow for flow, finish in last_finish.items() if finish <= virtual_time]:
+        del last_finish[flow]
+
+
+class FairQueue:
+    """Weighted fair queuing of requests onto a fixed number of concurrent slots.
+
+    Each flow (a user on one kind of endpoint) gets virtual finish tags of
+    cost / weight, and freed slots go to the waiting request with the lowest
+    tag, so one heavy user cannot starve the others and cheap endpoints are
+    served ahead of expensive ones. Each kind may also hold at most
+    kind_slots of the slots at once, so long renders cannot occupy every
+    slot; a waiting request of a kind at its cap is passed over for the
+    next one that can run.
+    """
+
+    def __init__(self, slots, kind_slots, max_waiting):
+        self.slots = slots
+        self.kind_slots = kind_slots
+        self.max_waiting = max_waiting
+        self._busy = 0
+        self._busy_by_kind = {kind: 0 for kind in kind_slots}
+        self._cond = threading.Condition()
+        self._heap = []
+        self._waiting = 0
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._seq = itertools.count()
+
+    def _dispatch(self):
+        """Grant free slots to waiting requests in finish tag order"""
+        passed_over = []
+        granted = False
+        while self._heap and self._busy < self.slots:
+            entry = heapq.heappop(self._heap)
+            ticket = entry[2]
+            if ticket['cancelled']:
+                continue
+            if self._busy_by_kind[ticket['kind']] >= self.kind_slots[ticket['kind']]:
+                passed_over.append(entry)
+                continue
+            ticket['granted'] = True
+            self._busy += 1
+            self._busy_by_kind[ticket['kind']] += 1
+            self._waiting -= 1
+            self._virtual_time = ticket['finish']
+            granted = True
+        if granted:
+            _forget_finished(self._last_finish, self._virtual_time)
+        for entry in passed_over:
+            heapq.heappush(self._heap, entry)
+        if granted:
+            self._cond.notify_all()
+
+    def acquire(self, flow, kind, cost, weight, timeout):
+        """Wait for a slot; False if the queue is full or timeout passes first"""
+        with self._cond:
+            if self._waiting >= self.max_waiting:
+                return False
+
+            start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+            finish = start + cost / weight
+            self._last_finish[flow] = finish
+            ticket = {'granted': False, 'cancelled': False, 'finish': finish, 'kind': kind}
+            heapq.heappush(self._heap, (finish, next(self._seq), ticket))
+            self._waiting += 1
+            self._dispatch()
+
+            deadline = time.monotonic() + timeout
+            while not ticket['granted']:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    ticket['cancelled'] = True
+                    self._waiting -= 1
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def release(self, kind):
+        with self._cond:
+            self._busy -= 1
+            self._busy_by_kind[kind] -= 1
+            self._dispatch()
+            if not self._busy and not self._waiting:
+                # Idle: finish tags only matter relative to each other, start over
+                self._heap.clear()
+                self._virtual_time = 0.0
+                self._last_finish.clear()
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+
+class FairExecutor:
+    """Background jobs on a fixed pool of threads, started in weighted fair order.
+
+    Each flow (a user) gets virtual finish tags of cost, so a user with many
+    queued jobs cannot hold the pool while other users' jobs wait behind
+    them; a newcomer's first job starts next.
+    """
+
+    def __init__(self, workers, name):
+        self.workers = workers
+        self.name = name
+        self._cond = threading.Condition()
+        self._heap = []
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._seq = itertools.count()
+        self._threads = []
+
+    def submit(self, flow, cost, fn, *args):
+        with self._cond:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+            finish = start + cost
+            self._last_finish[flow] = finish
+            heapq.heappush(self._heap, (finish, next(self._seq), fn, args))
+            self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                finish, _, fn, args = heapq.heappop(self._heap)
+                self._virtual_time = finish
+                _forget_finished(self._last_finish, finish)
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"{self.name} job error: {e}")
+
+    @property
+    def pending(self):
+        return len(self._heap)
+
+
+class Scheduler:
+    """Rate limits and fair scheduling for the expensive endpoints.
+
+    identify() returns (user_id, project_id) for the current request. Limits
+    are also charged to the client address, so a client that drops its
+    session cookie to get fresh buckets is still held to them. All state is
+    in process, so it can be exercised without any external service.
+    """
+
+    def __init__(self, identify, limits=None, weights=None, costs=None, slots=None, kind_slots=None,
+                 user_concurrency=None, max_waiting=None, queue_timeout=None, max_buckets=None):
+        self.identify = identify
+        self.weights = weights or Config.SCHEDULER_WEIGHTS
+        self.costs = costs or Config.SCHEDULER_COSTS
+        self.user_concurrency = user_concurrency or Config.SCHEDULER_USER_CONCURRENCY
+        self.queue_timeout = queue_timeout or Config.SCHEDULER_QUEUE_TIMEOUT
+        self.limiter = RateLimiter(limits or Config.RATE_LIMITS, max_buckets or Config.SCHEDULER_MAX_BUCKETS)
+        self.queue = FairQueue(slots or Config.SCHEDULER_SLOTS, kind_slots or Config.SCHEDULER_KIND_SLOTS,
+                               max_waiting or Config.SCHEDULER_MAX_WAITING)
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+        self._warned_proxy = False
+
+    def _reject(self, message, status, retry_after=None):
+        if retry_after is None:
+            response = jsonify({'error': message})
+        else:
+            response = jsonify({'error': message, 'retry_after': retry_after})
+            response.headers['Retry-After'] = str(retry_after)
+        response.status_code = status
+        return response
+
+    def _enter(self, kind, keys):
+        """Count a request against each key's concurrency cap; False if one is full"""
+        cap = self.user_concurrency[kind]
+        with self._in_flight_lock:
+            if any(self._in_flight.get((kind, key), 0) >= cap * scale for key, scale in keys.items()):
+                return False
+            for key in keys:
+                self._in_flight[(kind, key)] = self._in_flight.get((kind, key), 0) + 1
+            return True
+
+    def _leave(self, kind, keys):
+        with self._in_flight_lock:
+            for key in keys:
+                count = self._in_flight[(kind, key)] - 1
+                if count:
+                    self._in_flight[(kind, key)] = count
+                else:
+                    del self._in_flight[(kind, key)]
+
+    def limit(self, kind, cost=None):
+        """Decorate a view: charge its rate limits, then run it in a fair-queued slot.
+
+        cost is an optional callable returning the request's cost in units of
+        the kind's base cost (e.g. the number of questions in a batch). It
+        runs before the view, so it must cope with any request body.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                user_id, project_id = self.identify()
+                if not Config.TRUSTED_PROXIES and not self._warned_proxy and 'X-Forwarded-For' in request.headers:
+                    self._warned_proxy = True
+                    print("⚠ X-Forwarded-For received but TRUSTED_PROXIES is 0: every client shares the "
+                          "proxy's address bucket. Set TRUSTED_PROXIES to the number of proxies in front of the app.")
+                keys = {
+                    f"user:{user_id}": 1,
+                    f"project:{project_id}": 1,
+                    f"addr:{request.remote_addr}": Config.ADDRESS_LIMIT_SCALE,
+                }
+                units = max(1, cost()) if cost else 1
+
+                if units > self.limiter.max_cost(kind, keys):
+                    return self._reject('This request is larger than your rate limit allows. '
+                                        'Please split it into smaller requests.', 400)
+
+                retry_after = self.limiter.take(kind, keys, units)
+                if retry_after:
+                    return self._reject('Too many requests. Please slow down.', 429, math.ceil(retry_after))
+
+                if not self._enter(kind, keys):
+                    return self._reject('Please wait for your current request to finish.', 429,
+                                        Config.SCHEDULER_RETRY_AFTER)
+
+                def finish():
+                    self.queue.release(kind)
+                    self._leave(kind, keys)
+
+                if not self.queue.acquire((user_id, kind), kind, self.costs[kind] * units, self.weights[kind],
+                                          self.queue_timeout):
+                    self._leave(kind, keys)
+                    print(f"Shedding {kind} request for user: {user_id} ({self.queue.waiting} waiting)")
+                    return self._reject('Server is busy. Please try again shortly.', 503,
+                                        Config.SCHEDULER_RETRY_AFTER)
+
+                try:
+                    response = view(*args, **kwargs)
+                except Exception:
+                    finish()
+                    raise
+
+                # Streamed responses keep their slot until the client has the whole body
+                response = make_response(response)
+                if response.is_streamed:
+                    response.call_on_close(finish)
+                else:
+                    finish()
+                return response
+            return wrapper
+        return decorator
@@ -0,0 +1,149 @@
+import io
+import os
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+from config import Config
+
+_frame_executor = ThreadPoolExecutor(max_workers=Config.SLIDE_RENDER_WORKERS)
+
+
+@lru_cache(maxsize=1)
+def _template_bytes():
+    """The deck template, read and sized once per process and kept in memory"""
+    prs = Presentation(Config.SLIDE_TEMPLATE) if Config.SLIDE_TEMPLATE else Presentation()
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(7.5)
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def _fonts():
+    try:
+        return {
+            'title': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 480),
+            'subtitle': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 360),
+            'body': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 340),
+            'point': ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 220),
+        }
+    except OSError:
+        default = ImageFont.load_default()
+        return {'title': default, 'subtitle': default, 'body': default, 'point': default}
+
+
+def layout_slide(slide_info):
+    """Normalise a generated slide into the layout both renderers draw from"""
+    if slide_info.get('type') == 'title':
+        return {
+            'type': 'title',
+            'title': slide_info.get('title', 'Untitled'),
+            'subtitle': slide_info.get('subtitle', ''),
+        }
+    return {
+        'type': 'content',
+        'title': slide_info.get('title', 'Slide'),
+        'points': [str(point) for point in slide_info.get('points', [])],
+    }
+
+
+def render_frame(layout, output_path, width=2560, height=1440):
+    """Draw a slide layout as a video frame image"""
+    img = Image.new('RGB', (width, height), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    fonts = _fonts()
+
+    if layout['type'] == 'title':
+        title = layout['title']
+        subtitle = layout['subtitle']
+
+        title_bbox = draw.textbbox((0, 0), title, font=fonts['title'])
+        title_width = title_bbox[2] - title_bbox[0]
+        title_height = title_bbox[3] - title_bbox[1]
+        title_x = (width - title_width) // 2
+        title_y = height // 2 - 100
+
+        draw.text((title_x, title_y), title, fill=(0, 0, 0), font=fonts['title'])
+
+        if subtitle:
+            subtitle_bbox = draw.textbbox((0, 0), subtitle, font=fonts['subtitle'])
+            subtitle_width = subtitle_bbox[2] - subtitle_bbox[0]
+            subtitle_x = (width - subtitle_width) // 2
+            subtitle_y = title_y + title_height + 50
+
+            draw.text((subtitle_x, subtitle_y), subtitle, fill=(80, 80, 80), font=fonts['subtitle'])
+
+    else:
+        title = layout['title']
+
+        title_y = 120
+        draw.text((100, title_y), title, fill=(0, 0, 0), font=fonts['body'])
+
+        title_bbox = draw.textbbox((100, title_y), title, font=fonts['body'])
+        title_width = title_bbox[2] - title_bbox[0]
+        draw.rectangle([(100, title_y + 70), (100 + title_width, title_y + 76)], fill=(0, 0, 0))
+
+        y_position = title_y + 140
+        for point in layout['points']:
+            for line_idx, line in enumerate(textwrap.wrap(point, width=110)):
+                if line_idx == 0:
+                    draw.ellipse([(120, y_position + 12), (145, y_position + 37)], fill=(0, 0, 0))
+                draw.text((170, y_position), line, fill=(0, 0, 0), font=fonts['point'])
+                y_position += 220
+
+            y_position += 160
+
+    img.save(output_path)
+    return output_path
+
+
+class SlideDeck:
+    """Builds the PPTX and, optionally, the video frames from one pass over the slides.
+
+    PPTX slides are added on the calling thread (python-pptx is not thread
+    safe); frames are drawn on a shared pool so they render in parallel with
+    whatever the caller does next, such as narration.
+    """
+
+    def __init__(self, frame_dir=None):
+        self.prs = Presentation(io.BytesIO(_template_bytes()))
+        self.frame_dir = frame_dir
+        self._frames = []
+
+    def add(self, slide_info):
+        layout = layout_slide(slide_info)
+
+        if layout['type'] == 'title':
+            slide = self.prs.slides.add_slide(self.prs.slide_layouts[0])
+            slide.shapes.title.text = layout['title']
+            slide.placeholders[1].text = layout['subtitle']
+        else:
+            slide = self.prs.slides.add_slide(self.prs.slide_layouts[1])
+            slide.shapes.title.text = layout['title']
+
+            text_frame = slide.shapes.placeholders[1].text_frame
+            text_frame.clear()
+            for i, point in enumerate(layout['points']):
+                p = text_frame.paragraphs[0] if i == 0 else text_frame.add_paragraph()
+                p.text = point
+                p.level = 0
+                p.font.size = Pt(18)
+
+        if self.frame_dir:
+            frame_path = os.path.join(self.frame_dir, f"slide_{len(self._frames)}.png")
+            self._frames.append(_frame_executor.submit(render_frame, layout, frame_path))
+        return layout
+
+    def frame_paths(self):
+        """Wait for the frames and return their paths in slide order"""
+        return [future.result() for future in self._frames]
+
+    def save(self, target):
+        """Write the PPTX to a path or any writable stream"""
+        self.prs.save(target)
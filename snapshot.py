@@ -0,0 +1,262 @@
+import os
+import mmap
+import struct
+from array import array
+
+from config import Config
+
+# Snapshot layout (little endian):
+#   header   - magic, version, dim, count and the offset of every section
+#   vectors  - float32[count][dim], contiguous so the file can be memory-mapped
+#   offsets  - uint64[2 * count + 1], string i of row r lives at index 2r + i
+#   strings  - utf-8 content and metadata JSON of each row, back to back
+SNAPSHOT_MAGIC = b"NBLMSNAP"
+SNAPSHOT_VERSION = 1
+HEADER_FORMAT = "<8sIIQQQQ"
+HEADER_SIZE = 64
+COPY_NULL = "\\N"
+
+
+def _write_header(f, dim, count, vectors_offset, offsets_offset, strings_offset):
+    header = struct.pack(HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, dim, count,
+                         vectors_offset, offsets_offset, strings_offset)
+    f.seek(0)
+    f.write(header.ljust(HEADER_SIZE, b"\0"))
+
+
+def export_snapshot(conn, user_id, project_id, output_path, batch_size=None):
+    """Stream a project's documents rows into a snapshot file.
+
+    Rows are read through a server-side cursor inside a REPEATABLE READ
+    transaction so memory stays bounded by batch_size whatever the project size.
+    """
+    batch_size = batch_size or Config.SNAPSHOT_BATCH_SIZE
+    dim = Config.EMBEDDING_DIM
+
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT count(*) FROM documents WHERE user_id = %s AND project_id = %s",
+            (user_id, project_id)
+        )
+        count = cur.fetchone()[0]
+        cur.close()
+
+        vectors_offset = HEADER_SIZE
+        offsets_offset = vectors_offset + count * dim * 4
+        strings_offset = offsets_offset + (2 * count + 1) * 8
+
+        stream = conn.cursor(name=f"snapshot_export_{os.getpid()}")
+        stream.itersize = batch_size
+        stream.execute("""
+            SELECT content, COALESCE(metadata::text, ''), embedding::real[]
+            FROM documents
+            WHERE user_id = %s AND project_id = %s
+            ORDER BY id
+        """, (user_id, project_id))
+
+        with open(output_path, 'wb') as f:
+            _write_header(f, dim, count, vectors_offset, offsets_offset, strings_offset)
+            f.truncate(strings_offset)
+
+            row_index = 0
+            string_pos = 0
+            while True:
+                rows = stream.fetchmany(batch_size)
+                if not rows:
+                    break
+                if row_index + len(rows) > count:
+                    raise ValueError("Project changed while exporting snapshot")
+
+                vectors = array('f')
+                offsets = array('Q')
+                blob = bytearray()
+                for content, metadata, embedding in rows:
+                    if embedding is None or len(embedding) != dim:
+                        raise ValueError(f"Unexpected embedding dimension in row {row_index}")
+                    vectors.extend(embedding)
+                    for value in (content, metadata):
+                        offsets.append(string_pos)
+                        encoded = value.encode('utf-8')
+                        blob += encoded
+                        string_pos += len(encoded)
+
+                f.seek(vectors_offset + row_index * dim * 4)
+                f.write(vectors.tobytes())
+                f.seek(offsets_offset + 2 * row_index * 8)
+                f.write(offsets.tobytes())
+                f.seek(strings_offset + string_pos - len(blob))
+                f.write(blob)
+                row_index += len(rows)
+
+            if row_index != count:
+                raise ValueError("Project changed while exporting snapshot")
+
+            f.seek(offsets_offset + 2 * count * 8)
+            f.write(struct.pack("<Q", string_pos))
+
+        stream.close()
+        conn.commit()
+        return count
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.set_session(isolation_level='DEFAULT', readonly=False)
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mmap = None
+        try:
+            if os.fstat(self._file.fileno()).st_size < HEADER_SIZE:
+                raise ValueError("Not a project snapshot file")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._open_sections()
+        except Exception:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._file.close()
+            raise
+
+    def _open_sections(self):
+        """Check the header against the file size, then map the sections"""
+        (magic, version, self.dim, self.count, vectors_offset,
+         offsets_offset, self._strings_offset) = struct.unpack_from(HEADER_FORMAT, self._mmap)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a project snapshot file")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+
+        size = len(self._mmap)
+        if (self.dim == 0 or vectors_offset != HEADER_SIZE
+                or offsets_offset != vectors_offset + self.count * self.dim * 4
+                or self._strings_offset != offsets_offset + (2 * self.count + 1) * 8
+                or self._strings_offset > size):
+            raise ValueError("Snapshot file is truncated or corrupt")
+
+        (end,) = struct.unpack_from("<Q", self._mmap, self._strings_offset - 8)
+        if end != size - self._strings_offset:
+            raise ValueError("Snapshot file is truncated or corrupt")
+
+        view = memoryview(self._mmap)
+        self.vectors = view[vectors_offset:offsets_offset].cast('f')
+        self._offsets = view[offsets_offset:self._strings_offset].cast('Q')
+        self._strings = view[self._strings_offset:]
+        view.release()
+        if any(self._offsets[n] > self._offsets[n + 1] for n in range(2 * self.count)):
+            self._release()
+            raise ValueError("Snapshot file is truncated or corrupt")
+
+    def embedding(self, i):
+        return self.vectors[i * self.dim:(i + 1) * self.dim]
+
+    def _string(self, n):
+        return str(self._strings[self._offsets[n]:self._offsets[n + 1]], 'utf-8')
+
+    def content(self, i):
+        return self._string(2 * i)
+
+    def metadata(self, i):
+        return self._string(2 * i + 1) or None
+
+    def as_numpy(self):
+        """Zero-copy (count, dim) float32 matrix of the embeddings"""
+        import numpy as np
+        return np.frombuffer(self.vectors, dtype=np.float32).reshape(self.count, self.dim)
+
+    def _release(self):
+        for view in (self.vectors, self._offsets, self._strings):
+            view.release()
+
+    def close(self):
+        self._release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _copy_escape(value):
+    return (value.replace('\\', '\\\\').replace('\t', '\\t')
+                 .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class _CopyStream:
+    """File-like object feeding snapshot rows to COPY ... FROM STDIN"""
+
+    def __init__(self, snap, user_id, project_id):
+        self._snap = snap
+        self._suffix = f"\t{_copy_escape(user_id)}\t{_copy_escape(project_id)}\n"
+        self._row = 0
+        self._buffer = b""
+
+    def _next_line(self):
+        snap, i = self._snap, self._row
+        self._row += 1
+        metadata = snap.metadata(i)
+        vector = ','.join(format(x, '.9g') for x in snap.embedding(i))
+        line = (f"{_copy_escape(snap.content(i))}\t"
+                f"{_copy_escape(metadata) if metadata is not None else COPY_NULL}\t"
+                f"[{vector}]{self._suffix}")
+        return line.encode('utf-8')
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 1 << 20
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while length < size and self._row < self._snap.count:
+            line = self._next_line()
+            parts.append(line)
+            length += len(line)
+        data = b"".join(parts)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def import_snapshot(conn, path, user_id, project_id):
+    """Bulk load a snapshot into a project with COPY; no embedding calls are made."""
+    with Snapshot(path) as snap:
+        if snap.dim != Config.EMBEDDING_DIM:
+            raise ValueError(f"Snapshot embedding dimension {snap.dim} does not match {Config.EMBEDDING_DIM}")
+        cur = conn.cursor()
+        cur.copy_expert(
+            "COPY documents (content, metadata, embedding, user_id, project_id) FROM STDIN",
+            _CopyStream(snap, user_id, project_id),
+            size=Config.SNAPSHOT_COPY_BUFFER
+        )
+        conn.commit()
+        cur.close()
+        return snap.count
+
+
+if __name__ == '__main__':
+    import argparse
+    from db import get_db_connection
+
+    parser = argparse.ArgumentParser(description="Export or import a project snapshot")
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('user_id')
+    parser.add_argument('project_id')
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        if args.action == 'export':
+            count = export_snapshot(conn, args.user_id, args.project_id, args.path)
+            print(f"✓ Exported {count} chunks to {args.path}")
+        else:
+            count = import_snapshot(conn, args.path, args.user_id, args.project_id)
+            print(f"✓ Imported {count} chunks into {args.project_id}")
+    finally:
+        conn.close()
@@ -1,4 +1,7 @@
 const sources = new Set();
+const sourceProgress = {};
+const failedJobs = {};
+let uploadPollTimer = null;
 let isProcessing = false;
 
 function openUploadModal() {
@@ -11,13 +14,13 @@ function closeUploadModal() {
 
 async function uploadFile() {
     const fileInput = document.getElementById('fileInput');
-    const file = fileInput.files[0];
-    if (!file) return;
+    const files = Array.from(fileInput.files);
+    if (files.length === 0) return;
 
     closeUploadModal();
 
     const formData = new FormData();
-    formData.append('file', file);
+    files.forEach(file => formData.append('file', file));
 
     const sourcesEmpty = document.getElementById('sourcesEmpty');
     const chatEmpty = document.getElementById('chatEmpty');
@@ -31,8 +34,12 @@ async function uploadFile() {
         const result = await response.json();
 
         if (response.ok) {
-            sources.add(file.name);
+            result.jobs.forEach(job => {
+                sources.add(job.filename);
+                sourceProgress[job.filename] = 'Queued';
+            });
             updateSourcesList();
+            pollUploadJobs();
 
             if (sources.size > 0) {
                 sourcesEmpty.style.display = 'none';
@@ -49,6 +56,59 @@ async function uploadFile() {
     fileInput.value = '';
 }
 
+// Files are indexed in the background; poll until every job has finished
+async function pollUploadJobs() {
+    if (uploadPollTimer) return;
+
+    const poll = async () => {
+        let pending = false;
+        try {
+            const response = await fetch('/upload/jobs');
+            const result = await response.json();
+            (result.jobs || []).forEach(job => {
+                if (!sources.has(job.filename)) return;
+                delete failedJobs[job.filename];
+                if (job.status === 'done') {
+                    delete sourceProgress[job.filename];
+                } else if (job.status === 'failed') {
+                    sourceProgress[job.filename] = 'Failed: ' + job.error;
+                    failedJobs[job.filename] = job.id;
+                } else {
+                    pending = true;
+                    sourceProgress[job.filename] = job.total_chunks
+                        ? `Indexing ${Math.round(100 * job.processed_chunks / job.total_chunks)}%`
+                        : 'Queued';
+                }
+            });
+            updateSourcesList();
+        } catch (error) {
+            console.error('Error:', error);
+            pending = true;
+        }
+        uploadPollTimer = pending ? setTimeout(poll, 2000) : null;
+    };
+    uploadPollTimer = setTimeout(poll, 1000);
+}
+
+// Failed jobs keep their checkpoint, so a retry continues where indexing stopped
+async function retryUploadJob(filename) {
+    try {
+        const response = await fetch(`/upload/jobs/${failedJobs[filename]}/resume`, { method: 'POST' });
+        const result = await response.json();
+        if (!response.ok) {
+            alert('Error: ' + result.error);
+            return;
+        }
+        delete failedJobs[filename];
+        sourceProgress[filename] = 'Queued';
+        updateSourcesList();
+        pollUploadJobs();
+    } catch (error) {
+        console.error('Error:', error);
+        alert('Retry failed');
+    }
+}
+
 function updateSourcesList() {
     const list = document.getElementById('sourcesList');
     const emptyState = document.getElementById('sourcesEmpty');
@@ -62,6 +122,19 @@ function updateSourcesList() {
             <span class="source-icon">&#128196;</span>
             <span class="source-name">${s}</span>
         `;
+        if (sourceProgress[s]) {
+            const progress = document.createElement('small');
+            progress.className = 'source-progress';
+            progress.textContent = sourceProgress[s];
+            div.appendChild(progress);
+        }
+        if (failedJobs[s]) {
+            const retry = document.createElement('button');
+            retry.className = 'source-retry';
+            retry.textContent = 'Retry';
+            retry.onclick = () => retryUploadJob(s);
+            div.appendChild(retry);
+        }
         list.appendChild(div);
     });
     
@@ -140,29 +213,85 @@ async function generateAudio() {
     const btn = document.getElementById('audioBtn');
     const loading = document.getElementById('audioLoading');
     const playerContainer = document.getElementById('audioPlayerContainer');
+    const audio = document.getElementById('audioPlayer');
 
     btn.style.display = 'none';
     loading.classList.remove('hidden');
     playerContainer.classList.add('hidden');
 
-    try {
-        const response = await fetch('/generate_audio', { method: 'POST' });
-        const data = await response.json();
+    const fail = (message) => {
+        loading.classList.add('hidden');
+        alert(message || 'Error generating audio');
+        btn.style.display = 'block';
+    };
 
-        if (data.audio_url) {
-            const audio = document.getElementById('audioPlayer');
-            audio.src = data.audio_url;
-            playerContainer.classList.remove('hidden');
-            audio.play();
-        } else {
-            alert('Error generating audio: ' + data.error);
-            btn.style.display = 'block';
+    let job;
+    try {
+        const response = await fetch('/generate_audio/stream', { method: 'POST' });
+        job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.error);
         }
     } catch (e) {
-        alert('Request failed');
-        btn.style.display = 'block';
-    } finally {
+        fail(e.message);
+        return;
+    }
+
+    // The podcast streams in as it is generated, so playback starts after the first turn
+    audio.onplaying = () => {
         loading.classList.add('hidden');
+        playerContainer.classList.remove('hidden');
+    };
+    // A stream that is refused or cut off is not a failure by itself: followAudioJob
+    // reports failures and moves the player to the saved file
+    audio.onerror = () => {
+        if (!audio.src.endsWith(job.stream_url)) fail();
+    };
+    audio.src = job.stream_url;
+
+    try {
+        await audio.play();
+    } catch (e) {
+        // Autoplay can be blocked; the player is still usable. Other failures go to onerror
+        if (e.name === 'NotAllowedError') {
+            loading.classList.add('hidden');
+            playerContainer.classList.remove('hidden');
+        }
+    }
+
+    followAudioJob(job, audio, fail);
+}
+
+async function followAudioJob(job, audio, fail) {
+    // Once the podcast is saved, move the player to the finished file so seeking works
+    let errors = 0;
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        let response, status;
+        try {
+            response = await fetch(job.status_url);
+            status = await response.json();
+        } catch (e) {
+            if (++errors < 5) continue;
+            fail('Lost contact with the server while generating audio.');
+            return;
+        }
+        errors = 0;
+        if (response.ok && status.status === 'running') continue;
+        if (status.status === 'done' && audio.src.endsWith(job.stream_url)) {
+            const position = audio.currentTime;
+            const resume = !audio.paused && !audio.ended;
+            audio.src = status.audio_url;
+            document.getElementById('audioLoading').classList.add('hidden');
+            document.getElementById('audioPlayerContainer').classList.remove('hidden');
+            audio.addEventListener('loadedmetadata', () => {
+                audio.currentTime = position;
+                if (resume) audio.play().catch(() => {});
+            }, { once: true });
+        } else if (status.status !== 'done') {
+            fail('Audio generation failed. Please try again.');
+        }
+        return;
     }
 }
 
@@ -483,6 +612,11 @@ function markFlashcardBad() {
 }
 
 // Keyboard navigation for flashcards
+// The page starts with an empty chat, so start the server's conversation afresh too
+document.addEventListener('DOMContentLoaded', () => {
+    fetch('/chat/reset', { method: 'POST' }).catch(() => {});
+});
+
 document.addEventListener('keydown', (e) => {
     const viewer = document.getElementById('flashcardViewer');
     if (!viewer || viewer.classList.contains('hidden')) return;
@@ -0,0 +1,181 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, Response
+
+from scheduler import FairExecutor, FairQueue, RateLimiter, Scheduler, TokenBucket
+
+LIMITS = {"chat": (1.0, 5), "render": (0.01, 2)}
+WEIGHTS = {"chat": 4, "render": 1}
+COSTS = {"chat": 1, "render": 10}
+
+
+def test_token_bucket_spends_and_refills():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() > 0
+    time.sleep(0.15)
+    assert bucket.take() == 0
+
+
+def test_token_bucket_does_not_clamp_cost_to_burst():
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.take(3) > 0
+    assert bucket.tokens == 2
+
+
+def test_rate_limiter_charges_all_keys_or_none():
+    limiter = RateLimiter(LIMITS, max_buckets=100)
+    assert limiter.take("chat", {"user:a": 1, "addr:x": 1}, 5) == 0
+    # addr:x is empty, so user:b must not be charged either
+    assert limiter.take("chat", {"user:b": 1, "addr:x": 1}, 1) > 0
+    assert limiter.take("chat", {"user:b": 1}, 5) == 0
+
+
+def test_rate_limiter_scales_keys_and_reports_max_cost():
+    limiter = RateLimiter(LIMITS, max_buckets=100)
+    assert limiter.max_cost("chat", {"user:a": 1, "addr:x": 4}) == 5
+    assert limiter.take("chat", {"addr:x": 4}, 20) == 0
+
+
+def test_rate_limiter_evicts_least_recently_used():
+    limiter = RateLimiter(LIMITS, max_buckets=2)
+    for key in ("a", "b", "c"):
+        limiter.take("chat", {key: 1})
+    assert ("chat", "a") not in limiter._buckets
+
+
+def test_fair_queue_grants_lowest_finish_tag_first():
+    queue = FairQueue(1, {"chat": 1, "render": 1}, max_waiting=10)
+    assert queue.acquire(("hog", "render"), "render", 10, 1, 1)
+    order = []
+
+    def wait(flow, kind, cost, weight):
+        assert queue.acquire(flow, kind, cost, weight, 5)
+        order.append(flow[0])
+        queue.release(kind)
+
+    threads = [threading.Thread(target=wait, args=(("hog", "render"), "render", 10, 1))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=wait, args=(("light", "chat"), "chat", 1, 4)))
+    threads[1].start()
+    time.sleep(0.05)
+    queue.release("render")
+    for thread in threads:
+        thread.join()
+    assert order == ["light", "hog"]
+
+
+def test_fair_queue_caps_slots_per_kind():
+    queue = FairQueue(4, {"chat": 4, "render": 2}, max_waiting=10)
+    assert queue.acquire(("a", "render"), "render", 10, 1, 0.1)
+    assert queue.acquire(("b", "render"), "render", 10, 1, 0.1)
+    assert not queue.acquire(("c", "render"), "render", 10, 1, 0.1)
+    assert queue.acquire(("d", "chat"), "chat", 1, 4, 0.1)
+    queue.release("render")
+    assert queue.acquire(("c", "render"), "render", 10, 1, 0.1)
+
+
+def test_fair_queue_forgets_finished_flows():
+    queue = FairQueue(1, {"chat": 1}, max_waiting=100)
+    assert queue.acquire(("holder", "chat"), "chat", 1, 1, 1)
+    done = []
+    for i in range(20):
+        thread = threading.Thread(target=lambda i=i: done.append(queue.acquire((i, "chat"), "chat", 1, 1, 5)))
+        thread.start()
+        time.sleep(0.01)
+        queue.release("chat")
+        thread.join()
+    assert all(done)
+    assert len(queue._last_finish) <= 1
+
+
+def test_fair_executor_interleaves_users():
+    executor = FairExecutor(1, "test")
+    started = threading.Event()
+    gate = threading.Event()
+    order = []
+
+    def blocker():
+        started.set()
+        gate.wait(5)
+
+    executor.submit("heavy", 1, blocker)
+    started.wait(5)
+    for i in range(3):
+        executor.submit("heavy", 1, order.append, f"heavy{i}")
+    executor.submit("light", 1, order.append, "light")
+    gate.set()
+    deadline = time.monotonic() + 5
+    while len(order) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert order.index("light") < order.index("heavy1")
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    identity = {"user": "u1"}
+    scheduler = Scheduler(identify=lambda: (identity["user"], f"project_{identity['user']}"), limits=LIMITS, weights=WEIGHTS,
+                          costs=COSTS, slots=2, kind_slots={"chat": 2, "render": 1},
+                          user_concurrency={"chat": 2, "render": 1}, max_waiting=4, queue_timeout=0.2)
+
+    @app.route('/chat', methods=['POST'])
+    @scheduler.limit('chat', cost=lambda: 3)
+    def chat():
+        return {'ok': True}
+
+    @app.route('/render', methods=['POST'])
+    @scheduler.limit('render')
+    def render():
+        def body():
+            yield b"x"
+        return Response(body())
+
+    app.identity = identity
+    app.scheduler = scheduler
+    return app.test_client()
+
+
+def test_limit_rejects_when_bucket_is_empty(client):
+    assert client.post('/chat').status_code == 200
+    response = client.post('/chat')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_limit_charges_client_address_across_users(client):
+    # The address bucket holds 4x a user's burst of 5; each call costs 3
+    statuses = []
+    for i in range(8):
+        client.application.identity["user"] = f"fresh{i}"
+        statuses.append(client.post('/chat').status_code)
+    assert statuses.count(200) == 6
+    assert statuses[-1] == 429
+
+
+def test_limit_rejects_cost_above_burst():
+    app = Flask(__name__)
+    scheduler = Scheduler(identify=lambda: ("u", "p"), limits=LIMITS, weights=WEIGHTS, costs=COSTS,
+                          slots=2, kind_slots={"chat": 2, "render": 1}, user_concurrency={"chat": 2, "render": 1})
+
+    @app.route('/batch', methods=['POST'])
+    @scheduler.limit('chat', cost=lambda: 6)
+    def batch():
+        return {'ok': True}
+
+    response = app.test_client().post('/batch')
+    assert response.status_code == 400
+    assert 'Retry-After' not in response.headers
+
+
+def test_limit_holds_slot_until_stream_closes(client):
+    response = client.post('/render')
+    assert client.application.scheduler.queue._busy == 1
+    # The same user cannot start a second render while the first is open
+    assert client.post('/render').status_code == 429
+    response.close()
+    assert client.application.scheduler.queue._busy == 0